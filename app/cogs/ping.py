@@ -1,8 +1,12 @@
 import disnake
+from dishka import FromDishka
+from dishka_disnake.commands import slash_command
 from disnake.ext import commands
-from pathlib import Path
+import io
 
-from app.utils.viewer import GTAVTileViewer, Point
+from app.services import FragmentService
+from app.utils.metrics import STAGE_SECONDS, span
+from app.utils.viewer import Point
 
 
 class PingCommand(commands.Cog):
@@ -10,26 +14,31 @@ class PingCommand(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Абсолютный путь к assets относительно корня проекта
-        self.assets_dir = Path(__file__).parent.parent.parent / "assets"
 
-    @commands.slash_command()
-    async def a(self, inter: disnake.ApplicationCommandInteraction, x: float, y: float):
-        viewer = GTAVTileViewer(str(self.assets_dir))
+    @slash_command()
+    async def a(
+            self,
+            inter: disnake.ApplicationCommandInteraction,
+            x: float,
+            y: float,
+            fragments: FromDishka[FragmentService],
+            zoom: commands.Range[int, 0, 7] = 0,
+    ):
         world_point = Point(x, y)
 
-        fragment = viewer.get_fragment(
-            world_point=world_point,
-            size_x=1700,
-            size_y=600,
-        )
-
-        output_path = "frag.jpeg"
-        fragment.save(output_path, quality=100)
-        await inter.response.send_message(
-            f"/a {x} {y}",
-            file=disnake.File(output_path)
-        )
+        with span(STAGE_SECONDS, command="a", stage="render"):
+            fragment = await fragments.render(
+                world_point=world_point,
+                size_x=1700,
+                size_y=600,
+                zoom=zoom,
+            )
+
+        with span(STAGE_SECONDS, command="a", stage="upload"):
+            await inter.response.send_message(
+                f"/a {x} {y}",
+                file=disnake.File(io.BytesIO(fragment), filename="fragment.jpeg")
+            )
 
 
 def setup(bot: commands.Bot):
@@ -0,0 +1,68 @@
+import asyncio
+import io
+
+import disnake
+from dishka import FromDishka
+from dishka_disnake.commands import slash_command
+from disnake.ext import commands
+
+from app.services import FragmentService
+from app.utils.metrics import STAGE_SECONDS, span
+from app.utils.point_store import PointStore
+from app.utils.viewer import Point
+
+# Мировые границы карты assets/map (16384×24576 пикселей) с небольшим запасом
+WORLD_X = commands.Range[float, -4150, 4870]
+WORLD_Y = commands.Range[float, -5110, 8410]
+
+
+class PointsCommand(commands.Cog):
+    """Поиск точек карты."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @slash_command(description="Ближайшие точки к координатам")
+    async def nearest(
+            self,
+            inter: disnake.ApplicationCommandInteraction,
+            x: WORLD_X,
+            y: WORLD_Y,
+            points: FromDishka[PointStore],
+            fragments: FromDishka[FragmentService],
+            level: int | None = None,
+            count: commands.Range[int, 1, 10] = 5,
+    ):
+        # Поиск идёт в потоке, чтобы большой индекс не задерживал event loop
+        found = await asyncio.to_thread(points.index.nearest, x, y, k=count, level=level)
+        if not found:
+            await inter.response.send_message("Точки не найдены", ephemeral=True)
+            return
+
+        with span(STAGE_SECONDS, command="nearest", stage="defer"):
+            await inter.response.defer()
+
+        nearest_points = points.views(row for _, row in found)
+        lines = [
+            f"`{point.number}` ({point.x:.1f}, {point.y:.1f}) — {distance:.0f} м"
+            for (distance, _), point in zip(found, nearest_points)
+        ]
+        closest = nearest_points[0]
+        with span(STAGE_SECONDS, command="nearest", stage="render"):
+            fragment = await fragments.render(
+                world_point=Point(closest.x, closest.y),
+                size_x=800,
+                size_y=600,
+                dot_color="red",
+                show_points=True,
+            )
+
+        with span(STAGE_SECONDS, command="nearest", stage="upload"):
+            await inter.edit_original_response(
+                content="\n".join(lines),
+                file=disnake.File(io.BytesIO(fragment), filename="nearest.jpeg"),
+            )
+
+
+def setup(bot: commands.Bot):
+    bot.add_cog(PointsCommand(bot))
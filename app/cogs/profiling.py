@@ -0,0 +1,61 @@
+import disnake
+from dishka import FromDishka
+from dishka_disnake.commands import slash_command
+from disnake.ext import commands
+
+from app.utils.profiling import Profiler
+
+# Ответ на взаимодействие можно дополнять 15 минут
+MAX_WAIT_MINUTES = 14
+SUMMARY_PREVIEW_CHARS = 1800
+
+
+class ProfilingCommand(commands.Cog):
+    """Профилирование отрисовки и сессий по запросу администратора."""
+
+    def __init__(self, bot: commands.InteractionBot):
+        self.bot = bot
+
+    @slash_command(
+        description="Профилировать следующие вызовы отрисовки и сервиса сессий",
+        default_member_permissions=disnake.Permissions(administrator=True),
+    )
+    async def profile(
+            self,
+            inter: disnake.ApplicationCommandInteraction,
+            profiler: FromDishka[Profiler],
+            calls: commands.Range[int, 1, 500] = 20,
+            memory: bool = False,
+            wait_minutes: commands.Range[int, 1, MAX_WAIT_MINUTES] = 10,
+    ):
+        # Права команды сервер может переопределить, поэтому проверяем ещё раз
+        if not inter.permissions.administrator:
+            await inter.response.send_message("❌ Только для администраторов", ephemeral=True)
+            return
+
+        try:
+            run = profiler.arm(calls, memory=memory)
+        except RuntimeError:
+            await inter.response.send_message("❌ Профилирование уже запущено", ephemeral=True)
+            return
+
+        await inter.response.send_message(
+            f"Профилирую следующие {calls} вызовов, жду до {wait_minutes} мин", ephemeral=True,
+        )
+        if not await run.wait(wait_minutes * 60):
+            # Вызовов пришло меньше — сводка по тому, что успели снять
+            profiler.finish()
+            await run.wait()
+
+        summary = run.summary
+        if len(summary) > SUMMARY_PREVIEW_CHARS:
+            summary = summary[:SUMMARY_PREVIEW_CHARS] + "\n…"
+        await inter.followup.send(
+            f"`{run.directory}`\n```\n{summary}\n```",
+            file=disnake.File(run.directory / "summary.txt"),
+            ephemeral=True,
+        )
+
+
+def setup(bot: commands.InteractionBot):
+    bot.add_cog(ProfilingCommand(bot))
@@ -1,5 +1,6 @@
+import io
 import random
-from pathlib import Path
+from uuid import UUID
 
 import disnake
 from dishka import FromDishka
@@ -8,51 +9,78 @@ from dishka_disnake.ui import Button
 from disnake.ext import commands
 
 from app.models.discord import DiscordColor
-from app.services import SessionService
-from app.utils.viewer import GTAVTileViewer, Point
+from app.services import FragmentPrefetcher, SessionService
+from app.utils.metrics import COMMAND_SECONDS, STAGE_SECONDS, span
+from app.utils.viewer import Point
+
+SESSION_POINTS = [Point(x=2634.448, y=3292.035), Point(x=-1135.82, y=375.758)]
+SESSION_FRAGMENT = dict(size_x=800, size_y=600, dot_color="red")
 
 
 class But(Button):
-    def __init__(self, text: str, session_uuid: str, style=disnake.ButtonStyle.gray, row: int | None = 0):
+    def __init__(self, text: str, session_uuid: str, style=disnake.ButtonStyle.gray, row: int | None = 0,
+                 position: int = 0):
         self.session_uuid = session_uuid
-        self.cur = [Point(x=2634.448, y=3292.035), Point(x=-1135.82, y=375.758)]
-        self.iter = iter(self.cur)
+        self.cur = SESSION_POINTS
+        self.position = position
         super().__init__(style=style, label=text, row=row)
 
 
-class SwitchView(disnake.ui.View):
-    def __init__(self, session_uuid: str):
-        self.session_uuid = session_uuid
+class PrefetchedView(disnake.ui.View):
+    """View сессии, по таймауту которого сбрасывается буфер упреждающей отрисовки."""
+
+    def __init__(self, session_uuid: str, prefetcher: FragmentPrefetcher):
         super().__init__()
+        self.session_uuid = session_uuid
+        self.prefetcher = prefetcher
+        prefetcher.attach(session_uuid, self)
 
-        self.add_item(StartSessionButton(text="🎲", session_uuid=session_uuid, style=disnake.ButtonStyle.blurple))
+    async def on_timeout(self) -> None:
+        self.prefetcher.release(self.session_uuid, self)
 
 
-class StartSessionButton(But):
-    async def callback(self, inter: disnake.MessageInteraction, session_service: FromDishka[SessionService]):
-        await inter.response.defer()
-        await inter.edit_original_response(
-            embed=None,
-            files=[],
-        )
-        viewer = GTAVTileViewer(str(Path(__file__).parent.parent.parent / "assets"))
-        ps = next(self.iter)
-
-        fragment = viewer.get_fragment(
-            world_point=ps,
-            size_x=800,
-            size_y=600,
-            dot_color="red"
-        )
+class SwitchView(PrefetchedView):
+    def __init__(self, session_uuid: str, prefetcher: FragmentPrefetcher, position: int = 0):
+        super().__init__(session_uuid, prefetcher)
 
-        output_path = "frag.jpeg"
-        fragment.save(output_path, quality=100)
-        msg = await inter.edit_original_response(
-            embed=None,
-            files=[disnake.File(output_path)],
-            attachments=[],
-            view=SwitchView(session_uuid=self.session_uuid)
-        )
+        self.add_item(StartSessionButton(text="🎲", session_uuid=session_uuid, style=disnake.ButtonStyle.blurple,
+                                         position=position))
+
+
+class StartSessionButton(But):
+    async def callback(
+            self,
+            inter: disnake.MessageInteraction,
+            session_service: FromDishka[SessionService],
+            prefetcher: FromDishka[FragmentPrefetcher],
+    ):
+        # Нажатия кнопок не проходят через on_application_command, поэтому замеряются здесь
+        with span(COMMAND_SECONDS, command="session:start", status="ok"):
+            with span(STAGE_SECONDS, command="session:start", stage="defer"):
+                await inter.response.defer()
+                await inter.edit_original_response(
+                    embed=None,
+                    files=[],
+                )
+
+            with span(STAGE_SECONDS, command="session:start", stage="render"):
+                try:
+                    fragment = await prefetcher.get(self.session_uuid, self.position)
+                except KeyError:
+                    # Буфер сброшен по таймауту view — начинаем упреждение заново
+                    session = await session_service.get_session(UUID(str(self.session_uuid)))
+                    prefetcher.start(self.session_uuid, self.cur, ends_at=session.ends_at if session else None,
+                                     **SESSION_FRAGMENT)
+                    fragment = await prefetcher.get(self.session_uuid, self.position)
+
+            with span(STAGE_SECONDS, command="session:start", stage="upload"):
+                msg = await inter.edit_original_response(
+                    embed=None,
+                    files=[disnake.File(io.BytesIO(fragment), filename="fragment.jpeg")],
+                    attachments=[],
+                    view=SwitchView(session_uuid=self.session_uuid, prefetcher=prefetcher,
+                                    position=self.position + 1)
+                )
 
 
 class JoinSessionButton(But):
@@ -73,10 +101,10 @@ class DestroySessionButton(But):
         )
 
 
-class SessionView(disnake.ui.View):
+class SessionView(PrefetchedView):
 
-    def __init__(self, session_uuid: str):
-        super().__init__()
+    def __init__(self, session_uuid: str, prefetcher: FragmentPrefetcher):
+        super().__init__(session_uuid, prefetcher)
         self.add_item(StartSessionButton(text="📍 Начать", session_uuid=session_uuid, style=disnake.ButtonStyle.green))
         self.add_item(
             JoinSessionButton(text="🔗 Присоединится", session_uuid=session_uuid, style=disnake.ButtonStyle.blurple))
@@ -124,19 +152,23 @@ class SessionCog(commands.Cog):
             self,
             inter: disnake.CommandInteraction,
             session_service: FromDishka[SessionService],
+            prefetcher: FromDishka[FragmentPrefetcher],
     ):
         """Создать новую сессию."""
-        await inter.response.defer()
+        with span(STAGE_SECONDS, command="new", stage="defer"):
+            await inter.response.defer()
         title = f"{inter.user.display_name} сессия"
-        duration_hours = 0
+        duration_hours = None
+        session = None
         try:
-            session = await session_service.create_session(
-                title=title,
-                description="",
-                author_id=inter.user.id,
-                author_username=inter.user.display_name,
-                duration_hours=duration_hours,
-            )
+            with span(STAGE_SECONDS, command="new", stage="create"):
+                session = await session_service.create_session(
+                    title=title,
+                    description="",
+                    author_id=inter.user.id,
+                    author_username=inter.user.display_name,
+                    duration_hours=duration_hours,
+                )
 
             participants_list = self._build_participants_list(
                 session.participants, session.author_id
@@ -146,9 +178,15 @@ class SessionCog(commands.Cog):
                 name=inter.user.display_name,
                 icon_url=inter.user.display_avatar.url,
             )
-            await inter.edit_original_response(embed=embed, view=SessionView(session.id))
+            # Первые точки рендерятся, пока пользователь читает приглашение
+            prefetcher.start(session.id, SESSION_POINTS, ends_at=session.ends_at, **SESSION_FRAGMENT)
+            with span(STAGE_SECONDS, command="new", stage="upload"):
+                await inter.edit_original_response(embed=embed, view=SessionView(session.id, prefetcher))
 
         except Exception as e:
+            # Без показанного view буфер никто не освободит
+            if session is not None:
+                prefetcher.drop(session.id)
             await inter.edit_original_response(
                 content=f"❌ Ошибка при создании сессии: {str(e)}"
             )
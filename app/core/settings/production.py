@@ -1,8 +1,13 @@
+from pathlib import Path
+from typing import Literal
+
 from pydantic import Field, Secret
 from pydantic_settings import SettingsConfigDict
 
 from app.core.settings.app import AppBase
 
+ASSETS_DIR = Path(__file__).resolve().parents[3] / "assets"
+
 
 class ProdAppSettings(AppBase):
     model_config = SettingsConfigDict(env_file=".env")
@@ -13,4 +18,50 @@ class ProdAppSettings(AppBase):
     REDIS_HOST: str = Field(default="localhost")
     REDIS_PORT: int = Field(default=6379)
     REDIS_DB: int = Field(default=0)
-    REDIS_PASSWORD: str | None = Field(default=None)
\ No newline at end of file
+    REDIS_PASSWORD: str | None = Field(default=None)
+    REDIS_UNIX_SOCKET: Path | None = Field(default=None, description="Путь к unix-сокету вместо REDIS_HOST/REDIS_PORT")
+    REDIS_MAX_CONNECTIONS: int = Field(default=32, ge=2, description="Размер пула соединений")
+    REDIS_POOL_TIMEOUT_SECONDS: float = Field(default=5, gt=0, description="Ожидание свободного соединения пула")
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = Field(default=5, gt=0, description="Таймаут чтения и записи сокета")
+    REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS: float = Field(default=2, gt=0, description="Таймаут подключения")
+    REDIS_SOCKET_KEEPALIVE: bool = Field(default=True, description="TCP keepalive для соединений")
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS: float = Field(default=30, ge=0, description="Проверка простаивающих соединений")
+
+    # Session settings
+    SESSION_SWEEP_INTERVAL_SECONDS: float = Field(default=60, gt=0, description="Период очистки истёкших сессий")
+    SESSION_SWEEP_BATCH_SIZE: int = Field(default=500, gt=0, description="Сколько истёкших сессий убирать за раз")
+    SESSION_CACHE_ENABLED: bool = Field(default=True, description="Кэшировать горячие сессии в памяти процесса")
+    SESSION_CACHE_MAX_ENTRIES: int = Field(default=1024, gt=0, description="Сколько сессий держать в локальном кэше")
+    SESSION_CACHE_TTL_SECONDS: float = Field(default=30, gt=0, description="Время жизни сессии в локальном кэше")
+    SESSION_CACHE_CHANNEL: str = Field(default="sessions:invalidate", description="Канал pub/sub для инвалидации")
+
+    # Metrics settings
+    METRICS_ENABLED: bool = Field(default=True, description="Отдавать метрики Prometheus на /metrics")
+    METRICS_HOST: str = Field(default="0.0.0.0")
+    METRICS_PORT: int = Field(default=5001, description="Порт эндпоинта метрик, опубликован в docker-compose.yaml")
+
+    # Profiling settings
+    PROFILE_CALLS: int = Field(default=0, ge=0, description="Профилировать столько вызовов после запуска, 0 — выключено")
+    PROFILE_MEMORY: bool = Field(default=False, description="Снимать tracemalloc вместе с cProfile")
+    PROFILE_DIR: Path = Field(default=Path("profiles"), description="Куда писать pstats, снимки памяти и сводки")
+    PROFILE_TOP: int = Field(default=25, gt=0, description="Сколько строк показывать в сводке")
+
+    # Map viewer settings
+    MAP_TILES_DIR: Path = Field(default=ASSETS_DIR / "map")
+    MAP_BACKEND: Literal["tiles", "archive", "atlas"] = Field(
+        default="tiles",
+        description=(
+            "tiles — дерево <x>/<y>.jpg, archive — единый файл app.utils.tile_source, "
+            "atlas — растры app.utils.atlas, отображённые в память"
+        ),
+    )
+    MAP_ARCHIVE_PATH: Path = Field(default=ASSETS_DIR / "map.mbtiles")
+    TILE_CACHE_MB: float = Field(default=64, gt=0, description="Бюджет памяти кэша декодированных тайлов")
+    RENDER_EXECUTOR: Literal["thread", "process"] = Field(default="thread")
+    RENDER_WORKERS: int | None = Field(default=None, gt=0, description="Размер пула отрисовки")
+    RENDER_CONCURRENCY: int | None = Field(default=None, gt=0, description="Лимит одновременных отрисовок")
+    FRAGMENT_CACHE_TTL_SECONDS: int = Field(default=3600, gt=0, description="Время жизни фрагмента в Redis")
+    FRAGMENT_LOCAL_CACHE_MB: float = Field(default=16, gt=0, description="Бюджет локального кэша фрагментов")
+    POINTS_PATH: Path = Field(default=ASSETS_DIR / "points.json")
+    POINT_INDEX_CELL_SIZE: float = Field(default=250, gt=0, description="Размер ячейки индекса точек в мировых единицах")
+    PREFETCH_DEPTH: int = Field(default=3, ge=0, description="Сколько следующих точек сессии рендерить заранее")
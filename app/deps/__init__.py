@@ -1,9 +1,17 @@
 from app.deps.base import ConfigProvider
+from app.deps.metrics import MetricsProvider
+from app.deps.points import PointsProvider
+from app.deps.profiling import ProfilingProvider
 from app.deps.redis import RedisProvider
 from app.deps.session import SessionServiceProvider
+from app.deps.viewer import ViewerProvider
 
 __all__ = [
     "ConfigProvider",
+    "MetricsProvider",
+    "PointsProvider",
+    "ProfilingProvider",
     "RedisProvider",
     "SessionServiceProvider",
+    "ViewerProvider",
 ]
@@ -0,0 +1,64 @@
+from typing import AsyncIterable
+
+from dishka import Provider, Scope, provide
+from redis.asyncio import Redis
+
+from app.core.config import AppSettings
+from app.deps.redis import redis_pool_stats
+from app.repositories.cached_session_repository import SessionCache
+from app.utils.metrics import REGISTRY, CallbackMetric, MetricsServer
+from app.utils.viewer import GTAVTileViewer
+
+
+class MetricsProvider(Provider):
+    """Провайдер эндпоинта метрик."""
+
+    @provide(scope=Scope.APP)
+    async def get_metrics_server(
+            self,
+            settings: AppSettings,
+            redis: Redis,
+            viewer: GTAVTileViewer,
+            cache: SessionCache,
+    ) -> AsyncIterable[MetricsServer]:
+        """Зарегистрировать метрики кэшей и пула Redis и запустить HTTP-эндпоинт.
+
+        Статистика читается в момент сбора, поэтому на горячем пути ничего
+        дополнительно не считается.
+        """
+        tile_cache = viewer.tile_cache
+
+        def pool_connections():
+            stats = redis_pool_stats(redis)
+            if stats is None:
+                return []
+            return [({"state": "in_use"}, stats.in_use), ({"state": "idle"}, stats.idle)]
+
+        callbacks = [
+            CallbackMetric("waypoint_tile_cache_hits_total", "Decoded tile cache hits",
+                           lambda: [({}, tile_cache.stats().hits)], kind="counter"),
+            CallbackMetric("waypoint_tile_cache_misses_total", "Decoded tile cache misses",
+                           lambda: [({}, tile_cache.stats().misses)], kind="counter"),
+            CallbackMetric("waypoint_tile_cache_evictions_total", "Decoded tile cache evictions",
+                           lambda: [({}, tile_cache.stats().evictions)], kind="counter"),
+            CallbackMetric("waypoint_tile_cache_bytes", "Decoded tile cache resident bytes",
+                           lambda: [({}, tile_cache.stats().resident_bytes)]),
+            CallbackMetric("waypoint_redis_pool_connections", "Redis pool connections by state",
+                           pool_connections),
+            CallbackMetric("waypoint_session_cache_hits_total", "Local session cache hits",
+                           lambda: [({}, cache.hits)], kind="counter"),
+            CallbackMetric("waypoint_session_cache_misses_total", "Local session cache misses",
+                           lambda: [({}, cache.misses)], kind="counter"),
+            CallbackMetric("waypoint_session_cache_entries", "Local session cache entries",
+                           lambda: [({}, len(cache))]),
+        ]
+        for metric in callbacks:
+            REGISTRY.register(metric)
+
+        server = MetricsServer(REGISTRY, settings.app.METRICS_HOST, settings.app.METRICS_PORT)
+        if settings.app.METRICS_ENABLED:
+            await server.start()
+        yield server
+        await server.stop()
+        for metric in callbacks:
+            REGISTRY.unregister(metric.name)
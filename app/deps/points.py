@@ -0,0 +1,26 @@
+import logging
+
+from dishka import Provider, Scope, provide
+
+from app.core.config import AppSettings
+from app.utils.point_store import PointStore
+
+logger = logging.getLogger(__name__)
+
+
+class PointsProvider(Provider):
+    """Провайдер хранилища точек карты."""
+
+    @provide(scope=Scope.APP)
+    def get_point_store(self, settings: AppSettings) -> PointStore:
+        """Загрузить точки из ``POINTS_PATH`` в общее колоночное хранилище.
+
+        Пустой или отсутствующий файл даёт пустое хранилище, точки можно
+        добавить позже через ``PointStore.add``.
+        """
+        path = settings.app.POINTS_PATH
+        try:
+            return PointStore.load(path, cell_size=settings.app.POINT_INDEX_CELL_SIZE)
+        except FileNotFoundError:
+            logger.warning(f"Points file {path} not found, starting with an empty store")
+            return PointStore(cell_size=settings.app.POINT_INDEX_CELL_SIZE)
@@ -0,0 +1,31 @@
+import inspect
+from typing import AsyncIterable
+
+from dishka import Provider, Scope, provide
+
+from app.core.config import AppSettings
+from app.services.session_service import SessionService
+from app.utils.profiling import ProfileTarget, Profiler
+from app.utils.viewer import GTAVTileViewer
+
+
+def profile_targets() -> list[ProfileTarget]:
+    """Отрисовка фрагмента и все публичные асинхронные методы ``SessionService``."""
+    targets: list[ProfileTarget] = [(GTAVTileViewer, "get_fragment")]
+    for name, method in vars(SessionService).items():
+        if not name.startswith("_") and inspect.iscoroutinefunction(method):
+            targets.append((SessionService, name))
+    return targets
+
+
+class ProfilingProvider(Provider):
+    """Провайдер профилирования по запросу."""
+
+    @provide(scope=Scope.APP)
+    async def get_profiler(self, settings: AppSettings) -> AsyncIterable[Profiler]:
+        """Создать профилировщик; при ``PROFILE_CALLS`` он взводится сразу."""
+        profiler = Profiler(settings.app.PROFILE_DIR, profile_targets(), top=settings.app.PROFILE_TOP)
+        if settings.app.PROFILE_CALLS:
+            profiler.arm(settings.app.PROFILE_CALLS, memory=settings.app.PROFILE_MEMORY)
+        yield profiler
+        profiler.finish()
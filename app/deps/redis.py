@@ -1,20 +1,129 @@
+import logging
+import weakref
+from dataclasses import dataclass
+from typing import AsyncIterable
+
 from dishka import Provider, Scope, provide
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, Redis, UnixDomainSocketConnection
+from redis.asyncio.client import Pipeline
+from redis.asyncio.connection import AbstractConnection
 
 from app.core.config import AppSettings
+from app.utils.metrics import REDIS_SECONDS, span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RedisPoolStats:
+    in_use: int
+    idle: int
+    max_connections: int
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """Блокирующий пул, который сам считает выданные и открытые соединения."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checked_out: set[AbstractConnection] = set()
+        # Соединения, выброшенные пулом при reset, пропадают отсюда вместе с ним
+        self._opened: weakref.WeakSet[AbstractConnection] = weakref.WeakSet()
+
+    def make_connection(self) -> AbstractConnection:
+        connection = super().make_connection()
+        self._opened.add(connection)
+        return connection
+
+    async def get_connection(self, command_name=None, *keys, **options) -> AbstractConnection:
+        connection = await super().get_connection(command_name, *keys, **options)
+        self._checked_out.add(connection)
+        return connection
+
+    async def release(self, connection: AbstractConnection) -> None:
+        self._checked_out.discard(connection)
+        await super().release(connection)
+
+    def stats(self) -> RedisPoolStats:
+        """Занятые и свободные соединения пула."""
+        in_use = len(self._checked_out)
+        return RedisPoolStats(
+            in_use=in_use,
+            idle=max(len(self._opened) - in_use, 0),
+            max_connections=self.max_connections,
+        )
+
+
+def redis_pool_stats(redis: Redis) -> RedisPoolStats | None:
+    """Статистика пула клиента. None, если пул не ``InstrumentedConnectionPool``."""
+    pool = redis.connection_pool
+    return pool.stats() if isinstance(pool, InstrumentedConnectionPool) else None
+
+
+class InstrumentedPipeline(Pipeline):
+    """Конвейер, записывающий время выполнения в метрику обращений к Redis."""
+
+    async def execute(self, raise_on_error: bool = True):
+        with span(REDIS_SECONDS, command="MULTI" if self.is_transaction else "PIPELINE"):
+            return await super().execute(raise_on_error)
+
+
+class InstrumentedRedis(Redis):
+    """Redis клиент, записывающий время каждого обращения к серверу.
+
+    Одиночная команда — одно обращение с меткой по имени команды, конвейер —
+    одно обращение с меткой ``PIPELINE`` или ``MULTI``.
+    """
+
+    async def execute_command(self, *args, **options):
+        with span(REDIS_SECONDS, command=str(args[0]).upper()):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
 
 
 class RedisProvider(Provider):
     """Провайдер Redis клиента."""
 
     @provide(scope=Scope.APP)
-    def get_redis(self, settings: AppSettings) -> Redis:
-        """Создать Redis клиент."""
+    async def get_redis(self, settings: AppSettings) -> AsyncIterable[Redis]:
+        """Создать Redis клиент с ограниченным блокирующим пулом соединений.
+
+        Когда все ``REDIS_MAX_CONNECTIONS`` соединений заняты, команды ждут
+        освободившееся до ``REDIS_POOL_TIMEOUT_SECONDS`` вместо открытия новых.
+        """
         settings = settings.app
-        return Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
+        options = dict(
             db=settings.REDIS_DB,
             password=settings.REDIS_PASSWORD,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
             decode_responses=False,
         )
+        if settings.REDIS_UNIX_SOCKET:
+            pool = InstrumentedConnectionPool(
+                connection_class=UnixDomainSocketConnection,
+                path=str(settings.REDIS_UNIX_SOCKET),
+                **options,
+            )
+        else:
+            pool = InstrumentedConnectionPool(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                socket_keepalive=settings.REDIS_SOCKET_KEEPALIVE,
+                **options,
+            )
+
+        # Клиент из from_pool владеет пулом и закрывает его вместе с собой
+        redis = InstrumentedRedis.from_pool(pool)
+        yield redis
+        stats = pool.stats()
+        logger.info(
+            f"Closing Redis pool: {stats.in_use} in use, {stats.idle} idle, "
+            f"{stats.max_connections} max"
+        )
+        await redis.aclose()
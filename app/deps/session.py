@@ -1,9 +1,15 @@
+from typing import AsyncIterable
+
 from dishka import Provider, Scope, provide
 from redis.asyncio import Redis
 
+from app.core.config import AppSettings
+
+from app.repositories.cached_session_repository import CachedSessionRepository, SessionCache
 from app.repositories.redis_session_repository import RedisSessionRepository
 from app.repositories.session_repository import SessionRepository
 from app.services.session_service import SessionService
+from app.services.session_sweeper import SessionSweeper
 
 
 class SessionServiceProvider(Provider):
@@ -17,12 +23,34 @@ class SessionServiceProvider(Provider):
         """Создать Redis репозиторий."""
         return RedisSessionRepository(redis)
 
+    @provide(scope=Scope.APP)
+    async def get_session_cache(
+            self,
+            settings: AppSettings,
+            redis: Redis,
+    ) -> AsyncIterable[SessionCache]:
+        """Создать локальный кэш сессий и подписаться на инвалидацию."""
+        cache = SessionCache(
+            redis,
+            max_entries=settings.app.SESSION_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.app.SESSION_CACHE_TTL_SECONDS,
+            channel=settings.app.SESSION_CACHE_CHANNEL,
+        )
+        if settings.app.SESSION_CACHE_ENABLED:
+            cache.start()
+        yield cache
+        await cache.stop()
+
     @provide(scope=Scope.REQUEST)
     def get_session_repository(
             self,
+            settings: AppSettings,
             redis_repo: RedisSessionRepository,
+            cache: SessionCache,
     ) -> SessionRepository:
-        """Получить репозиторий сессий."""
+        """Получить репозиторий сессий, при включённом кэше — через него."""
+        if settings.app.SESSION_CACHE_ENABLED:
+            return CachedSessionRepository(redis_repo, cache)
         return redis_repo
 
     @provide(scope=Scope.REQUEST)
@@ -32,3 +60,19 @@ class SessionServiceProvider(Provider):
     ) -> SessionService:
         """Создать сервис управления сессиями."""
         return SessionService(repository)
+
+    @provide(scope=Scope.APP)
+    async def get_session_sweeper(
+            self,
+            settings: AppSettings,
+            redis: Redis,
+    ) -> AsyncIterable[SessionSweeper]:
+        """Создать и запустить фоновую очистку истёкших сессий."""
+        sweeper = SessionSweeper(
+            RedisSessionRepository(redis),
+            interval_seconds=settings.app.SESSION_SWEEP_INTERVAL_SECONDS,
+            batch_size=settings.app.SESSION_SWEEP_BATCH_SIZE,
+        )
+        sweeper.start()
+        yield sweeper
+        await sweeper.stop()
@@ -0,0 +1,86 @@
+from typing import AsyncIterable
+
+from dishka import Provider, Scope, provide
+from redis.asyncio import Redis
+
+from app.core.config import AppSettings
+from app.services.fragment_service import FragmentService
+from app.services.prefetch_service import FragmentPrefetcher
+from app.utils.async_viewer import AsyncTileViewer
+from app.utils.atlas import RasterAtlas
+from app.utils.manifest import MANIFEST_NAME, TileManifest
+from app.utils.point_store import PointStore
+from app.utils.tile_source import ArchiveTileSource
+from app.utils.viewer import GTAVTileViewer
+
+
+class ViewerProvider(Provider):
+    """Провайдер просмотрщика карты."""
+
+    @provide(scope=Scope.APP)
+    def get_viewer(self, settings: AppSettings, points: PointStore) -> GTAVTileViewer:
+        """Создать общий на всё приложение просмотрщик тайлов.
+
+        Тайлы читаются из заранее собранного манифеста
+        (``python -m app.utils.manifest``) или архива
+        (``python -m app.utils.tile_source``), поэтому сканирование
+        директории с картой не выполняется.
+        """
+        tiles_dir = settings.app.MAP_TILES_DIR
+        source = None
+        atlases = None
+        if settings.app.MAP_BACKEND == "archive":
+            source = ArchiveTileSource(settings.app.MAP_ARCHIVE_PATH)
+        elif settings.app.MAP_BACKEND == "atlas":
+            manifest = TileManifest.load(tiles_dir / MANIFEST_NAME)
+            atlases = RasterAtlas.open_levels(tiles_dir, manifest.levels)
+            if not atlases:
+                raise ValueError(f"No raster atlas found in {tiles_dir}, run app.utils.atlas first")
+
+        return GTAVTileViewer(
+            str(tiles_dir),
+            cache_mb=settings.app.TILE_CACHE_MB,
+            atlases=atlases,
+            source=source,
+            points=points,
+        )
+
+    @provide(scope=Scope.APP)
+    async def get_async_viewer(
+            self,
+            settings: AppSettings,
+            viewer: GTAVTileViewer,
+    ) -> AsyncIterable[AsyncTileViewer]:
+        """Создать асинхронный просмотрщик с пулом воркеров отрисовки."""
+        async_viewer = AsyncTileViewer(
+            viewer,
+            executor=settings.app.RENDER_EXECUTOR,
+            max_workers=settings.app.RENDER_WORKERS,
+            max_concurrency=settings.app.RENDER_CONCURRENCY,
+        )
+        yield async_viewer
+        async_viewer.shutdown()
+
+    @provide(scope=Scope.APP)
+    def get_fragment_service(
+            self,
+            settings: AppSettings,
+            viewer: AsyncTileViewer,
+            redis: Redis,
+    ) -> FragmentService:
+        """Создать сервис отрисовки фрагментов с кэшем в Redis."""
+        return FragmentService(
+            viewer,
+            redis,
+            ttl_seconds=settings.app.FRAGMENT_CACHE_TTL_SECONDS,
+            local_cache_mb=settings.app.FRAGMENT_LOCAL_CACHE_MB,
+        )
+
+    @provide(scope=Scope.APP)
+    def get_prefetcher(
+            self,
+            settings: AppSettings,
+            fragments: FragmentService,
+    ) -> FragmentPrefetcher:
+        """Создать упреждающий рендерер точек сессий."""
+        return FragmentPrefetcher(fragments, depth=settings.app.PREFETCH_DEPTH)
@@ -1,11 +1,18 @@
+import asyncio
+
+import disnake
 from dishka import make_async_container
 from dishka_disnake import setup_dishka
 from disnake.ext import commands
 
 from app.deps import (
-    ConfigProvider, RedisProvider, SessionServiceProvider,
+    ConfigProvider, MetricsProvider, PointsProvider, ProfilingProvider, RedisProvider, SessionServiceProvider,
+    ViewerProvider,
 )
 from app.core.config import get_app_settings
+from app.services import SessionSweeper
+from app.utils.metrics import COMMAND_SECONDS, MetricsServer, span
+from app.utils.profiling import Profiler
 
 command_sync_flags = commands.CommandSyncFlags.default()
 command_sync_flags.sync_commands_debug = True
@@ -18,12 +25,26 @@ async def on_ready():
     print(f"Logged in as {bot.user} (ID: {bot.user.id})\n------")
 
 
-def run():
+@bot.event
+async def on_application_command(inter: disnake.ApplicationCommandInteraction):
+    """Обрабатывает slash-команду, записывая её длительность в метрики."""
+    with span(COMMAND_SECONDS, command=inter.data.name, status="ok") as labels:
+        await bot.process_application_commands(inter)
+        # Ошибки команд не пробрасываются, а отправляются в on_slash_command_error
+        if getattr(inter, "command_failed", False):
+            labels["status"] = "error"
+
+
+async def main():
     settings = get_app_settings()
     container = make_async_container(
         ConfigProvider(),
         RedisProvider(),
         SessionServiceProvider(),
+        ViewerProvider(),
+        PointsProvider(),
+        MetricsProvider(),
+        ProfilingProvider(),
     )
 
     # Настраиваем интеграцию dishka с disnake
@@ -34,8 +55,24 @@ def run():
     bot.load_extension("app.cogs.animals")
     bot.load_extension("app.cogs.get_image")
     bot.load_extension("app.cogs.session")
+    bot.load_extension("app.cogs.points")
+    bot.load_extension("app.cogs.profiling")
+
+    # Очистка истёкших сессий работает всё время жизни контейнера
+    await container.get(SessionSweeper)
+    # Эндпоинт метрик поднимается до подключения к Discord
+    await container.get(MetricsServer)
+    # PROFILE_CALLS взводит профилирование при создании профилировщика
+    await container.get(Profiler)
+    try:
+        await bot.start(settings.app.BOT_TOKEN.get_secret_value())
+    finally:
+        await bot.close()
+        await container.close()
 
-    bot.run(settings.app.BOT_TOKEN.get_secret_value())
+
+def run():
+    asyncio.run(main())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime
+from typing import AsyncIterator
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.models.discord import Session, SessionParticipant
+from app.repositories.session_repository import SessionRepository
+
+logger = logging.getLogger(__name__)
+
+
+def _copy_session(session: Session) -> Session:
+    # Все поля сессии, кроме списка участников, неизменяемы
+    return session.model_copy(update={"participants": [p.model_copy() for p in session.participants]})
+
+
+class SessionCache:
+    """Локальный LRU-кэш сессий с TTL и инвалидацией через pub/sub Redis.
+
+    Все процессы бота подписаны на канал ``channel``; записывающий процесс
+    публикует в него id изменённой сессии (``*`` — все сессии), и каждый
+    процесс выбрасывает её из своего кэша. Пока подписка не установлена,
+    кэш не отдаёт и не сохраняет сессии: пропущенное сообщение означало бы
+    устаревшие данные. TTL ограничивает их возраст, если публикация не удалась.
+    """
+
+    ALL = "*"
+    POLL_SECONDS = 1.0
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        max_entries: int = 1024,
+        ttl_seconds: float = 30,
+        channel: str = "sessions:invalidate",
+    ):
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.channel = channel
+        self._entries: OrderedDict[UUID, tuple[float, Session]] = OrderedDict()
+        # Растёт при каждой инвалидации: чтение, начатое до неё, не попадёт в кэш
+        self._generation = 0
+        self._subscribed = False
+        self._task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def subscribed(self) -> bool:
+        """Установлена ли подписка на канал инвалидации; без неё кэш не используется."""
+        return self._subscribed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def peek(self, session_id: UUID) -> Session | None:
+        """Закэшированная сессия без копирования; изменять её нельзя."""
+        if not self._subscribed:
+            return None
+        entry = self._entries.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, session = entry
+        if expires_at <= time.monotonic() or session.ends_at <= datetime.now(tz=UTC):
+            del self._entries[session_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return session
+
+    def get(self, session_id: UUID) -> Session | None:
+        """Копия закэшированной сессии."""
+        session = self.peek(session_id)
+        return _copy_session(session) if session is not None else None
+
+    def set(self, session: Session, generation: int) -> None:
+        """Сохранить копию сессии, прочитанной при поколении ``generation``."""
+        if not self._subscribed or generation != self._generation:
+            return
+        self._entries[session.id] = (time.monotonic() + self.ttl_seconds, _copy_session(session))
+        self._entries.move_to_end(session.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: UUID | None = None) -> None:
+        """Выбросить сессию (или все сессии) из локального кэша."""
+        self._generation += 1
+        if session_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(session_id, None)
+
+    async def publish(self, session_id: UUID | None = None) -> None:
+        """Инвалидировать сессию локально и во всех процессах."""
+        self.invalidate(session_id)
+        try:
+            await self.redis.publish(self.channel, self.ALL if session_id is None else str(session_id))
+        except RedisError as e:
+            logger.warning(f"Session invalidation publish failed for {session_id}: {e}")
+
+    def _handle(self, message: bytes) -> None:
+        if message == self.ALL.encode():
+            self.invalidate()
+            return
+        try:
+            self.invalidate(UUID(message.decode()))
+        except ValueError:
+            logger.warning(f"Ignoring malformed session invalidation message {message!r}")
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                while True:
+                    # Ожидание с таймаутом: блокирующее чтение упёрлось бы в socket_timeout пула
+                    message = await pubsub.get_message(ignore_subscribe_messages=False, timeout=self.POLL_SECONDS)
+                    if message is None:
+                        continue
+                    if message["type"] == "subscribe":
+                        # Сообщения до подписки потеряны, поэтому начинаем с пустого кэша
+                        self.invalidate()
+                        self._subscribed = True
+                    elif message["type"] == "message":
+                        self._handle(message["data"])
+            except RedisError as e:
+                logger.warning(f"Session invalidation channel lost, retrying: {e}")
+            finally:
+                self._subscribed = False
+                self.invalidate()
+                await pubsub.aclose()
+            await asyncio.sleep(1)
+
+    def start(self) -> None:
+        """Подписаться на канал инвалидации в фоне. Повторный вызов ничего не делает."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen(), name="session-cache-invalidation")
+
+    async def stop(self) -> None:
+        """Отписаться от канала и очистить кэш."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+class CachedSessionRepository(SessionRepository):
+    """Репозиторий сессий, читающий горячие сессии из ``SessionCache``.
+
+    Чтения одной сессии идут через кэш, списки и обходы — напрямую в
+    ``repository``. После каждой успешной записи сессия инвалидируется
+    во всех процессах.
+    """
+
+    def __init__(self, repository: SessionRepository, cache: SessionCache):
+        self.repository = repository
+        self.cache = cache
+
+    async def _load(self, session_id: UUID) -> Session | None:
+        # Исходная сессия остаётся у вызывающего, кэш хранит свою копию
+        generation = self.cache.generation
+        session = await self.repository.get_by_id(session_id)
+        if session is not None:
+            self.cache.set(session, generation)
+        return session
+
+    async def create(self, session: Session) -> Session:
+        return await self.repository.create(session)
+
+    async def get_by_id(self, session_id: UUID) -> Session | None:
+        session = self.cache.get(session_id)
+        if session is not None:
+            return session
+        return await self._load(session_id)
+
+    async def get_all(self, batch_size: int = 500) -> list[Session]:
+        return await self.repository.get_all(batch_size)
+
+    def iter_sessions(self, batch_size: int = 500) -> AsyncIterator[Session]:
+        return self.repository.iter_sessions(batch_size)
+
+    async def update(self, session: Session) -> Session:
+        try:
+            return await self.repository.update(session)
+        finally:
+            await self.cache.publish(session.id)
+
+    async def delete(self, session_id: UUID) -> bool:
+        deleted = await self.repository.delete(session_id)
+        if deleted:
+            await self.cache.publish(session_id)
+        return deleted
+
+    async def delete_all(self) -> int:
+        try:
+            return await self.repository.delete_all()
+        finally:
+            await self.cache.publish()
+
+    async def get_ends_at(self, session_id: UUID) -> datetime | None:
+        session = self.cache.peek(session_id)
+        if session is not None:
+            return session.ends_at
+        return await self.repository.get_ends_at(session_id)
+
+    async def remove_expired(self, now: datetime, batch_size: int = 500) -> int:
+        # Истёкшие сессии кэш отбрасывает сам, сравнивая ends_at с текущим временем
+        return await self.repository.remove_expired(now, batch_size)
+
+    async def migrate(self, batch_size: int = 500) -> int:
+        return await self.repository.migrate(batch_size)
+
+    async def add_participant(self, session_id: UUID, participant: SessionParticipant) -> bool:
+        added = await self.repository.add_participant(session_id, participant)
+        if added:
+            await self.cache.publish(session_id)
+        return added
+
+    async def remove_participant(self, session_id: UUID, user_id: int) -> bool:
+        removed = await self.repository.remove_participant(session_id, user_id)
+        if removed:
+            await self.cache.publish(session_id)
+        return removed
+
+    async def participant_count(self, session_id: UUID) -> int:
+        session = self.cache.peek(session_id)
+        if session is not None:
+            return len(session.participants)
+        return await self.repository.participant_count(session_id)
+
+    async def is_participant(self, session_id: UUID, user_id: int) -> bool:
+        session = self.cache.peek(session_id)
+        if session is not None:
+            return any(p.user_id == user_id for p in session.participants)
+        return await self.repository.is_participant(session_id, user_id)
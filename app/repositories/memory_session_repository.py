@@ -0,0 +1,122 @@
+from datetime import UTC, datetime
+from typing import AsyncIterator
+from uuid import UUID
+
+from app.models.discord import Session, SessionParticipant
+from app.repositories.session_repository import SessionRepository
+
+
+def _aware(moment: datetime) -> datetime:
+    # Время без зоны считается UTC, как и в Redis-реализации
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=UTC)
+
+
+class InMemorySessionRepository(SessionRepository):
+    """Репозиторий сессий в памяти процесса.
+
+    Повторяет поведение ``RedisSessionRepository``: закончившиеся сессии
+    не читаются, но остаются в индексе до ``remove_expired``; участники
+    отдаются по порядку вступления; наружу уходят только копии. Нужен для
+    разработки без Redis и для замеров самого слоя репозитория.
+    """
+
+    def __init__(self):
+        # Сессии хранятся без участников, участники — отдельно по user_id
+        self._sessions: dict[UUID, Session] = {}
+        self._participants: dict[UUID, dict[int, SessionParticipant]] = {}
+
+    def _live(self, session_id: UUID) -> Session | None:
+        session = self._sessions.get(session_id)
+        if session is None or _aware(session.ends_at) <= datetime.now(tz=UTC):
+            return None
+        return session
+
+    def _require(self, session_id: UUID) -> dict[int, SessionParticipant]:
+        if self._live(session_id) is None:
+            raise ValueError(f"Session with id {session_id} not found")
+        return self._participants[session_id]
+
+    def _snapshot(self, session: Session) -> Session:
+        participants = sorted(self._participants[session.id].values(), key=lambda p: p.joined_at)
+        return session.model_copy(update={"participants": [p.model_copy() for p in participants]})
+
+    async def create(self, session: Session) -> Session:
+        self._sessions[session.id] = session.model_copy(update={"participants": []})
+        self._participants[session.id] = {p.user_id: p.model_copy() for p in session.participants}
+        return session
+
+    async def get_by_id(self, session_id: UUID) -> Session | None:
+        session = self._live(session_id)
+        return self._snapshot(session) if session is not None else None
+
+    async def get_all(self, batch_size: int = 500) -> list[Session]:
+        return [self._snapshot(session) for session_id in list(self._sessions)
+                if (session := self._live(session_id)) is not None]
+
+    async def iter_sessions(self, batch_size: int = 500) -> AsyncIterator[Session]:
+        for session_id in list(self._sessions):
+            session = self._live(session_id)
+            if session is not None:
+                yield self._snapshot(session)
+
+    async def update(self, session: Session) -> Session:
+        if self._live(session.id) is None:
+            raise ValueError(f"Session with id {session.id} does not exist")
+        self._sessions[session.id] = session.model_copy(update={"participants": []})
+        return session
+
+    async def delete(self, session_id: UUID) -> bool:
+        # Закончившаяся сессия в Redis уже удалена по EXPIREAT
+        deleted = self._live(session_id) is not None
+        self._sessions.pop(session_id, None)
+        self._participants.pop(session_id, None)
+        return deleted
+
+    async def delete_all(self) -> int:
+        deleted = sum(1 for session_id in self._sessions if self._live(session_id) is not None)
+        self._sessions.clear()
+        self._participants.clear()
+        return deleted
+
+    async def get_ends_at(self, session_id: UUID) -> datetime | None:
+        session = self._sessions.get(session_id)
+        return None if session is None else _aware(session.ends_at)
+
+    async def remove_expired(self, now: datetime, batch_size: int = 500) -> int:
+        now = _aware(now)
+        expired = []
+        for session_id, session in self._sessions.items():
+            if _aware(session.ends_at) <= now:
+                expired.append(session_id)
+                if len(expired) >= batch_size:
+                    break
+        for session_id in expired:
+            del self._sessions[session_id]
+            del self._participants[session_id]
+        return len(expired)
+
+    async def add_participant(
+        self,
+        session_id: UUID,
+        participant: SessionParticipant,
+    ) -> bool:
+        participants = self._require(session_id)
+        if participant.user_id in participants:
+            return False
+        participants[participant.user_id] = participant.model_copy()
+        return True
+
+    async def remove_participant(
+        self,
+        session_id: UUID,
+        user_id: int,
+    ) -> bool:
+        return self._require(session_id).pop(user_id, None) is not None
+
+    async def participant_count(self, session_id: UUID) -> int:
+        if self._live(session_id) is None:
+            return 0
+        return len(self._participants[session_id])
+
+    async def is_participant(self, session_id: UUID, user_id: int) -> bool:
+        return self._live(session_id) is not None and user_id in self._participants[session_id]
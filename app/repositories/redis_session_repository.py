@@ -1,40 +1,185 @@
 import json
-from datetime import datetime
+import math
+from datetime import UTC, datetime
+from typing import AsyncIterator, Iterable
 from uuid import UUID
 
 from redis.asyncio import Redis
 
 from app.models.discord import Session, SessionParticipant
+from app.repositories.session_codec import (
+    decode_participants, decode_session, encode_participant, encode_session,
+)
 from app.repositories.session_repository import SessionRepository
 
 
+# KEYS[1] — хэш сессии, KEYS[2] — хэш участников, KEYS[3] — индекс по ends_at;
+# ARGV[1] — ends_at (unix time), ARGV[2] — id сессии, ARGV[3] — число
+# аргументов HSET, за ними пары поле/значение, затем поля для HDEL.
+# Возвращает 0, если сессии нет.
+UPDATE_SESSION_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local count = tonumber(ARGV[3])
+if count > 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 4, count + 3))
+end
+if #ARGV > count + 3 then
+    redis.call('HDEL', KEYS[1], unpack(ARGV, count + 4))
+end
+redis.call('EXPIREAT', KEYS[1], ARGV[1])
+redis.call('EXPIREAT', KEYS[2], ARGV[1])
+redis.call('ZADD', KEYS[3], ARGV[1], ARGV[2])
+return 1
+"""
+
+# KEYS[1] — индекс по ends_at, KEYS[2] — множество id сессий;
+# ARGV[1] — текущее время (unix time), ARGV[2] — размер пачки.
+# Сами хэши удаляет Redis по EXPIREAT, здесь чистятся только индексы.
+REMOVE_EXPIRED_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #expired > 0 then
+    redis.call('ZREM', KEYS[1], unpack(expired))
+    redis.call('SREM', KEYS[2], unpack(expired))
+end
+return #expired
+"""
+
+# Хэш участников живёт столько же, сколько хэш сессии
+_COPY_PARTICIPANTS_TTL = """
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl > 0 then
+    redis.call('PEXPIRE', KEYS[2], ttl)
+end
+"""
+
+# Перенос участников из устаревшего JSON-поля participants хэша сессии
+# в отдельный хэш. user_id извлекается из строки: cjson разбирает числа
+# как double и теряет точность на Discord snowflake.
+_MIGRATE_PARTICIPANTS = """
+local legacy = redis.call('HGET', KEYS[1], 'participants')
+if legacy then
+    for _, item in ipairs(cjson.decode(legacy)) do
+        local user_id = string.match(item, '"user_id":%s*(%d+)')
+        if user_id then
+            redis.call('HSETNX', KEYS[2], user_id, item)
+        end
+    end
+    redis.call('HDEL', KEYS[1], 'participants')
+""" + _COPY_PARTICIPANTS_TTL + """
+end
+"""
+
+# KEYS[1] — хэш сессии, KEYS[2] — хэш участников. Возвращают -1, если сессии нет.
+ADD_PARTICIPANT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+""" + _MIGRATE_PARTICIPANTS + """
+local added = redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[2])
+""" + _COPY_PARTICIPANTS_TTL + """
+return added
+"""
+
+REMOVE_PARTICIPANT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+""" + _MIGRATE_PARTICIPANTS + """
+return redis.call('HDEL', KEYS[2], ARGV[1])
+"""
+
+PARTICIPANT_COUNT_SCRIPT = _MIGRATE_PARTICIPANTS + """
+return redis.call('HLEN', KEYS[2])
+"""
+
+IS_PARTICIPANT_SCRIPT = _MIGRATE_PARTICIPANTS + """
+return redis.call('HEXISTS', KEYS[2], ARGV[1])
+"""
+
+# Поля хэша сессии в текстовом формате до session_codec
+LEGACY_SESSION_FIELDS = ("id", "title", "description", "color", "created_at", "ends_at", "state", "author_id")
+
+# Перевод сессии в бинарный формат. KEYS[1] — хэш сессии, KEYS[2] — хэш
+# участников, KEYS[3] — индекс по ends_at; ARGV[1] — ends_at (unix time),
+# ARGV[2] — id сессии, ARGV[3] — закодированная сессия, далее пары
+# user_id/участник. Поля и участники, уже записанные в новом формате, не
+# перезаписываются. Сессиям, созданным до появления EXPIREAT, выставляется
+# срок жизни и запись в индексе по ends_at.
+MIGRATE_SESSION_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+""" + _MIGRATE_PARTICIPANTS + """
+if redis.call('HEXISTS', KEYS[1], 'data') == 0 then
+    redis.call('HSET', KEYS[1], 'data', ARGV[3])
+    redis.call('HDEL', KEYS[1], """ + ", ".join(f"'{field}'" for field in LEGACY_SESSION_FIELDS) + """)
+end
+if redis.call('TTL', KEYS[1]) == -1 then
+    redis.call('ZADD', KEYS[3], ARGV[1], ARGV[2])
+    redis.call('EXPIREAT', KEYS[2], ARGV[1])
+    redis.call('EXPIREAT', KEYS[1], ARGV[1])
+end
+for i = 4, #ARGV, 2 do
+    local current = redis.call('HGET', KEYS[2], ARGV[i])
+    if current and string.sub(current, 1, 1) == '{' then
+        redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+    end
+end
+return 1
+"""
+
+
 class RedisSessionRepository(SessionRepository):
     """Redis-реализация репозитория сессий.
 
     Использует Redis Hash для хранения данных сессии.
     Ключи имеют префикс 'session:' для изоляции данных.
+    Каждая изменяющая операция, кроме пакетного ``delete_all``, выполняется
+    за один запрос к Redis: транзакцией MULTI/EXEC или Lua-скриптом с
+    проверками на стороне сервера.
+    Участники хранятся в отдельном хэше 'session:<id>:participants'
+    (поле — user_id), поэтому вход и выход не переписывают сессию.
+    Оба хэша истекают по EXPIREAT в момент ends_at; id сессий, кроме
+    множества 'sessions:all', лежат в сортированном множестве
+    'sessions:by_ends_at', из которого их вычищает ``remove_expired``.
+    Сессия и участники хранятся в бинарном формате ``session_codec``;
+    хэши в прежнем текстовом формате читаются и переводятся при чтении.
     """
 
     KEY_PREFIX = "session:"
+    PARTICIPANTS_SUFFIX = ":participants"
     ALL_SESSIONS_KEY = "sessions:all"
+    EXPIRY_INDEX_KEY = "sessions:by_ends_at"
+    # Отметка о завершённом переносе сессий прежнего формата; при новом
+    # переносе версия увеличивается
+    MIGRATED_KEY = "sessions:migrated"
+    MIGRATION_VERSION = 1
+    SESSION_FIELD = "data"
+    # Сколько HGETALL отправляется в одном конвейере
+    DEFAULT_BATCH_SIZE = 500
 
     def __init__(self, redis_client: Redis):
         self.redis = redis_client
+        self._update_script = redis_client.register_script(UPDATE_SESSION_SCRIPT)
+        self._add_participant_script = redis_client.register_script(ADD_PARTICIPANT_SCRIPT)
+        self._remove_participant_script = redis_client.register_script(REMOVE_PARTICIPANT_SCRIPT)
+        self._participant_count_script = redis_client.register_script(PARTICIPANT_COUNT_SCRIPT)
+        self._is_participant_script = redis_client.register_script(IS_PARTICIPANT_SCRIPT)
+        self._remove_expired_script = redis_client.register_script(REMOVE_EXPIRED_SCRIPT)
+        self._migrate_script = redis_client.register_script(MIGRATE_SESSION_SCRIPT)
 
-    def _get_key(self, session_id: UUID) -> str:
+    def _get_key(self, session_id: UUID | str) -> str:
         """Сформировать ключ для сессии в Redis."""
         return f"{self.KEY_PREFIX}{session_id}"
 
-    def _serialize_participant(self, participant: SessionParticipant) -> str:
-        """Сериализовать участника в JSON."""
-        return json.dumps({
-            "user_id": participant.user_id,
-            "username": participant.username,
-            "joined_at": participant.joined_at.isoformat(),
-        })
+    def _get_participants_key(self, session_id: UUID | str) -> str:
+        """Сформировать ключ хэша участников сессии."""
+        return f"{self.KEY_PREFIX}{session_id}{self.PARTICIPANTS_SUFFIX}"
 
     def _deserialize_participant(self, data: str) -> SessionParticipant:
-        """Десериализовать участника из JSON."""
+        """Десериализовать участника из JSON прежнего формата."""
         parsed = json.loads(data)
         return SessionParticipant(
             user_id=parsed["user_id"],
@@ -42,33 +187,19 @@ class RedisSessionRepository(SessionRepository):
             joined_at=datetime.fromisoformat(parsed["joined_at"]),
         )
 
-    def _serialize_session(self, session: Session) -> dict:
-        """Сериализовать сессию для хранения в Redis."""
-        participants_data = [
-            self._serialize_participant(p) for p in session.participants
-        ]
-        return {
-            "id": str(session.id),
-            "title": session.title,
-            "description": session.description,
-            "color": session.color.as_hex() if session.color else None,
-            "created_at": session.created_at.isoformat(),
-            "ends_at": session.ends_at.isoformat(),
-            "state": session.state.value,
-            "author_id": str(session.author_id) if session.author_id else None,
-            "participants": json.dumps(participants_data),
-        }
-
-    def _deserialize_session(self, data: dict) -> Session:
-        """Десериализовать данные из Redis в сессию."""
-        participants = []
-        participants_raw = data.get("participants")
-        if participants_raw:
-            participants_list = json.loads(participants_raw)
-            participants = [
-                self._deserialize_participant(p) for p in participants_list
-            ]
+    def _serialize_participants(self, participants: list[SessionParticipant]) -> dict:
+        """Сериализовать участников в поля хэша участников."""
+        return {str(p.user_id): encode_participant(p) for p in participants}
+
+    @staticmethod
+    def _timestamp(moment: datetime) -> int:
+        """Unix time для EXPIREAT и индекса; время без зоны считается UTC."""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=UTC)
+        return math.ceil(moment.timestamp())
 
+    def _deserialize_legacy_session(self, data: dict, participants: list[SessionParticipant]) -> Session:
+        """Десериализовать хэш сессии прежнего текстового формата."""
         author_id_str = data.get("author_id")
         author_id = int(author_id_str) if author_id_str else None
 
@@ -86,84 +217,241 @@ class RedisSessionRepository(SessionRepository):
 
     async def create(self, session: Session) -> Session:
         key = self._get_key(session.id)
-        data = self._serialize_session(session)
-        await self.redis.hset(key, mapping=data)
-        await self.redis.sadd(self.ALL_SESSIONS_KEY, str(session.id))
+        participants_key = self._get_participants_key(session.id)
+        ends_at = self._timestamp(session.ends_at)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key, participants_key)
+            pipe.hset(key, self.SESSION_FIELD, encode_session(session))
+            pipe.expireat(key, ends_at)
+            if session.participants:
+                pipe.hset(participants_key, mapping=self._serialize_participants(session.participants))
+                pipe.expireat(participants_key, ends_at)
+            pipe.sadd(self.ALL_SESSIONS_KEY, str(session.id))
+            pipe.zadd(self.EXPIRY_INDEX_KEY, {str(session.id): ends_at})
+            await pipe.execute()
         return session
 
-    async def get_by_id(self, session_id: UUID) -> Session | None:
-        key = self._get_key(session_id)
-        data = await self.redis.hgetall(key)
+    def _decode_session(self, data: dict, participants_data: dict) -> tuple[Session | None, list | None]:
+        """Декодировать хэши сессии и участников.
+
+        Вторым элементом возвращаются аргументы MIGRATE_SESSION_SCRIPT,
+        если что-то из прочитанного записано в прежнем формате.
+        """
         if not data:
-            return None
-        # Декодируем байты в строки
-        decoded_data = {k.decode(): v.decode() for k, v in data.items()}
-        return self._deserialize_session(decoded_data)
+            return None, None
+
+        encoded_participants = []
+        legacy_participants = []
+        for user_id, raw in participants_data.items():
+            if raw[:1] == b"{":
+                legacy_participants.append(self._deserialize_participant(raw.decode()))
+            else:
+                encoded_participants.append((int(user_id), raw))
+        participants = {p.user_id: p for p in decode_participants(encoded_participants)}
+        participants.update((p.user_id, p) for p in legacy_participants)
+
+        legacy_raw = data.get(b"participants")
+        if legacy_raw:
+            for raw in json.loads(legacy_raw):
+                participant = self._deserialize_participant(raw)
+                if participant.user_id not in participants:
+                    participants[participant.user_id] = participant
+                    legacy_participants.append(participant)
+        participants = sorted(participants.values(), key=lambda p: p.joined_at)
+
+        encoded = data.get(self.SESSION_FIELD.encode())
+        if encoded is not None:
+            session = decode_session(encoded, participants)
+            if not legacy_participants and not legacy_raw:
+                return session, None
+        else:
+            decoded_data = {k.decode(): v.decode() for k, v in data.items()}
+            session = self._deserialize_legacy_session(decoded_data, participants)
+
+        migration = [self._timestamp(session.ends_at), str(session.id), encode_session(session)]
+        for participant in legacy_participants:
+            migration.extend((str(participant.user_id), encode_participant(participant)))
+        return session, migration
+
+    async def get_by_id(self, session_id: UUID) -> Session | None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(self._get_key(session_id))
+            pipe.hgetall(self._get_participants_key(session_id))
+            data, participants_data = await pipe.execute()
+
+        session, migration = self._decode_session(data, participants_data)
+        if migration:
+            await self._migrate_script(
+                keys=[self._get_key(session_id), self._get_participants_key(session_id), self.EXPIRY_INDEX_KEY],
+                args=migration,
+            )
+        return session
+
+    async def _get_many(self, session_ids: Iterable[bytes]) -> list[Session]:
+        """Прочитать сессии и их участников одним конвейером, пропуская удалённые."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for session_id in session_ids:
+                pipe.hgetall(self._get_key(session_id.decode()))
+                pipe.hgetall(self._get_participants_key(session_id.decode()))
+            results = await pipe.execute()
 
-    async def get_all(self) -> list[Session]:
-        session_ids = await self.redis.smembers(self.ALL_SESSIONS_KEY)
         sessions = []
-        for session_id_bytes in session_ids:
-            session_id = UUID(session_id_bytes.decode())
-            session = await self.get_by_id(session_id)
+        migrations = []
+        for data, participants_data in zip(results[::2], results[1::2]):
+            session, migration = self._decode_session(data, participants_data)
             if session:
                 sessions.append(session)
+            if migration:
+                migrations.append((session.id, migration))
+
+        if migrations:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for session_id, migration in migrations:
+                    await self._migrate_script(
+                        keys=[self._get_key(session_id), self._get_participants_key(session_id),
+                              self.EXPIRY_INDEX_KEY],
+                        args=migration,
+                        client=pipe,
+                    )
+                await pipe.execute()
+        return sessions
+
+    async def get_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> list[Session]:
+        session_ids = list(await self.redis.smembers(self.ALL_SESSIONS_KEY))
+        sessions = []
+        for offset in range(0, len(session_ids), batch_size):
+            sessions.extend(await self._get_many(session_ids[offset:offset + batch_size]))
         return sessions
 
+    async def iter_sessions(self, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[Session]:
+        # SSCAN может вернуть id повторно в другой пачке (например, при
+        # перестроении множества); память обхода не растёт с числом сессий,
+        # поэтому повторы убираются только внутри пачки
+        cursor = 0
+        while True:
+            cursor, session_ids = await self.redis.sscan(self.ALL_SESSIONS_KEY, cursor, count=batch_size)
+            if session_ids:
+                for session in await self._get_many(list(dict.fromkeys(session_ids))):
+                    yield session
+            if cursor == 0:
+                return
+
     async def update(self, session: Session) -> Session:
+        # Участники не перезаписываются: они меняются только через add/remove_participant
         key = self._get_key(session.id)
-        exists = await self.redis.exists(key)
-        if not exists:
+        # Поля прежнего формата удаляются, если сессия ещё не переведена
+        args = [
+            self._timestamp(session.ends_at), str(session.id), 2,
+            self.SESSION_FIELD, encode_session(session), *LEGACY_SESSION_FIELDS,
+        ]
+
+        updated = await self._update_script(
+            keys=[key, self._get_participants_key(session.id), self.EXPIRY_INDEX_KEY],
+            args=args,
+        )
+        if not updated:
             raise ValueError(f"Session with id {session.id} does not exist")
-        data = self._serialize_session(session)
-        await self.redis.hset(key, mapping=data)
         return session
 
     async def delete(self, session_id: UUID) -> bool:
         key = self._get_key(session_id)
-        deleted = await self.redis.delete(key)
-        if deleted:
-            await self.redis.srem(self.ALL_SESSIONS_KEY, str(session_id))
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key, self._get_participants_key(session_id))
+            pipe.srem(self.ALL_SESSIONS_KEY, str(session_id))
+            pipe.zrem(self.EXPIRY_INDEX_KEY, str(session_id))
+            deleted, _, _ = await pipe.execute()
         return bool(deleted)
 
     async def delete_all(self) -> int:
-        session_ids = await self.redis.smembers(self.ALL_SESSIONS_KEY)
-        if not session_ids:
-            return 0
-        keys = [self._get_key(UUID(sid.decode())) for sid in session_ids]
-        deleted = await self.redis.delete(*keys)
-        await self.redis.delete(self.ALL_SESSIONS_KEY)
+        # Пачками по DEFAULT_BATCH_SIZE, чтобы не блокировать Redis одной
+        # длинной операцией: SPOP забирает id из множества, UNLINK освобождает
+        # память хэшей в фоне. Сессии, созданные во время удаления, могут уцелеть.
+        deleted = 0
+        while session_ids := await self.redis.spop(self.ALL_SESSIONS_KEY, self.DEFAULT_BATCH_SIZE):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for session_id in session_ids:
+                    pipe.unlink(self._get_key(session_id.decode()))
+                    pipe.unlink(self._get_participants_key(session_id.decode()))
+                pipe.zrem(self.EXPIRY_INDEX_KEY, *session_ids)
+                results = await pipe.execute()
+            deleted += sum(results[:-1:2])
         return deleted
 
+    async def get_ends_at(self, session_id: UUID) -> datetime | None:
+        score = await self.redis.zscore(self.EXPIRY_INDEX_KEY, str(session_id))
+        return None if score is None else datetime.fromtimestamp(score, tz=UTC)
+
+    async def remove_expired(self, now: datetime, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        return await self._remove_expired_script(
+            keys=[self.EXPIRY_INDEX_KEY, self.ALL_SESSIONS_KEY],
+            args=[math.floor(now.timestamp()), batch_size],
+        )
+
+    async def migrate(self, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Перевести сессии прежнего текстового формата.
+
+        Такие сессии созданы до EXPIREAT и индекса по ends_at: без переноса
+        они не истекают и не попадают в ``remove_expired``. Читаются только
+        хэши без поля ``data``, перевод выполняет MIGRATE_SESSION_SCRIPT.
+        После полного обхода ставится отметка ``MIGRATED_KEY``, и следующие
+        запуски ничего не сканируют.
+        """
+        if await self.redis.get(self.MIGRATED_KEY) == str(self.MIGRATION_VERSION).encode():
+            return 0
+
+        migrated = 0
+        cursor = 0
+        while True:
+            cursor, session_ids = await self.redis.sscan(self.ALL_SESSIONS_KEY, cursor, count=batch_size)
+            if session_ids:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for session_id in session_ids:
+                        pipe.hexists(self._get_key(session_id.decode()), self.SESSION_FIELD)
+                    converted = await pipe.execute()
+                legacy = [session_id for session_id, done in zip(session_ids, converted) if not done]
+                if legacy:
+                    migrated += len(await self._get_many(legacy))
+            if cursor == 0:
+                break
+
+        await self.redis.set(self.MIGRATED_KEY, self.MIGRATION_VERSION)
+        return migrated
+
     async def add_participant(
         self,
         session_id: UUID,
         participant: SessionParticipant,
-    ) -> Session:
+    ) -> bool:
         """Добавить участника в сессию."""
-        session = await self.get_by_id(session_id)
-        if not session:
+        added = await self._add_participant_script(
+            keys=[self._get_key(session_id), self._get_participants_key(session_id)],
+            args=[str(participant.user_id), encode_participant(participant)],
+        )
+        if added < 0:
             raise ValueError(f"Session with id {session_id} not found")
-
-        # Проверяем, нет ли уже такого участника
-        for p in session.participants:
-            if p.user_id == participant.user_id:
-                return session  # Уже есть, ничего не делаем
-
-        session.participants.append(participant)
-        return await self.update(session)
+        return bool(added)
 
     async def remove_participant(
         self,
         session_id: UUID,
         user_id: int,
-    ) -> Session:
+    ) -> bool:
         """Удалить участника из сессии."""
-        session = await self.get_by_id(session_id)
-        if not session:
+        removed = await self._remove_participant_script(
+            keys=[self._get_key(session_id), self._get_participants_key(session_id)],
+            args=[str(user_id)],
+        )
+        if removed < 0:
             raise ValueError(f"Session with id {session_id} not found")
+        return bool(removed)
 
-        session.participants = [
-            p for p in session.participants if p.user_id != user_id
-        ]
-        return await self.update(session)
+    async def participant_count(self, session_id: UUID) -> int:
+        return await self._participant_count_script(
+            keys=[self._get_key(session_id), self._get_participants_key(session_id)],
+        )
+
+    async def is_participant(self, session_id: UUID, user_id: int) -> bool:
+        return bool(await self._is_participant_script(
+            keys=[self._get_key(session_id), self._get_participants_key(session_id)],
+            args=[str(user_id)],
+        ))
@@ -0,0 +1,89 @@
+from datetime import UTC, datetime
+from functools import lru_cache
+from typing import Iterable
+from uuid import UUID
+
+import msgpack
+from pydantic import TypeAdapter
+from pydantic_extra_types.color import Color
+
+from app.models.discord import Session, SessionParticipant
+
+# Первый байт значения — версия формата. Старые версии остаются
+# декодируемыми, записывается всегда текущая.
+SESSION_CODEC_VERSION = 1
+
+# Участники валидируются одним вызовом pydantic-core на весь список
+_PARTICIPANTS_ADAPTER = TypeAdapter(list[SessionParticipant])
+
+
+def _aware(moment: datetime) -> datetime:
+    # Время хранится расширением msgpack Timestamp, которому нужна зона;
+    # время без зоны считается UTC
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=UTC)
+
+
+def _pack(payload: list) -> bytes:
+    return bytes((SESSION_CODEC_VERSION,)) + msgpack.packb(payload, datetime=True)
+
+
+def _unpack(data: bytes) -> list:
+    # timestamp=3 — Timestamp сразу в datetime с зоной UTC
+    return msgpack.unpackb(data, timestamp=3)
+
+
+@lru_cache(maxsize=256)
+def _color(value: str) -> Color:
+    # Разбор цвета дороже всей остальной сессии, а цветов в ходу немного
+    return Color(value)
+
+
+def encode_session(session: Session) -> bytes:
+    """Закодировать поля сессии (без участников) в компактный бинарный вид."""
+    return _pack([
+        session.id.bytes,
+        session.title,
+        session.description,
+        session.color.as_hex() if session.color else None,
+        _aware(session.created_at),
+        _aware(session.ends_at),
+        int(session.state),
+        session.author_id,
+    ])
+
+
+def decode_session(data: bytes, participants: list[SessionParticipant]) -> Session:
+    """Декодировать сессию, записанную ``encode_session`` любой поддерживаемой версии."""
+    version = data[0]
+    if version != 1:
+        raise ValueError(f"Unsupported session codec version: {version}")
+
+    session_id, title, description, color, created_at, ends_at, state, author_id = _unpack(data[1:])
+    return Session.model_validate({
+        "id": UUID(bytes=session_id),
+        "title": title,
+        "description": description,
+        "color": _color(color) if color else None,
+        "created_at": created_at,
+        "ends_at": ends_at,
+        "state": state,
+        "author_id": author_id,
+        "participants": participants,
+    })
+
+
+def encode_participant(participant: SessionParticipant) -> bytes:
+    """Закодировать участника; user_id хранится в имени поля хэша."""
+    return _pack([participant.username, _aware(participant.joined_at)])
+
+
+def decode_participants(items: Iterable[tuple[int, bytes]]) -> list[SessionParticipant]:
+    """Декодировать пары ``(user_id, значение)`` из хэша участников."""
+    records = []
+    for user_id, data in items:
+        version = data[0]
+        if version != 1:
+            raise ValueError(f"Unsupported participant codec version: {version}")
+        username, joined_at = _unpack(data[1:])
+        records.append({"user_id": user_id, "username": username, "joined_at": joined_at})
+    return _PARTICIPANTS_ADAPTER.validate_python(records)
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator
 from uuid import UUID
 
 from app.models.discord import Session, SessionParticipant
@@ -22,13 +24,28 @@ class SessionRepository(ABC):
         pass
 
     @abstractmethod
-    async def get_all(self) -> list[Session]:
-        """Получить все сессии."""
+    async def get_all(self, batch_size: int = 500) -> list[Session]:
+        """Получить все сессии, читая хранилище пачками по ``batch_size``."""
+        pass
+
+    @abstractmethod
+    def iter_sessions(self, batch_size: int = 500) -> AsyncIterator[Session]:
+        """Перебрать все сессии постранично, не загружая их в память целиком.
+
+        Сессии, созданные или удалённые во время обхода, могут как попасть
+        в него, так и нет. Память обхода не зависит от числа сессий, поэтому
+        сессия, которую хранилище переместило во время обхода, может
+        встретиться в нём дважды.
+        """
         pass
 
     @abstractmethod
     async def update(self, session: Session) -> Session:
-        """Обновить существующую сессию."""
+        """Обновить существующую сессию.
+
+        Список участников не перезаписывается: он меняется только через
+        ``add_participant``/``remove_participant``.
+        """
         pass
 
     @abstractmethod
@@ -41,13 +58,39 @@ class SessionRepository(ABC):
         """Удалить все сессии. Возвращает количество удалённых."""
         pass
 
+    @abstractmethod
+    async def get_ends_at(self, session_id: UUID) -> datetime | None:
+        """Время окончания сессии без чтения самой сессии. None, если сессии нет."""
+        pass
+
+    @abstractmethod
+    async def remove_expired(self, now: datetime, batch_size: int = 500) -> int:
+        """Убрать из индексов до ``batch_size`` сессий, закончившихся к ``now``.
+
+        Возвращает количество убранных; меньше ``batch_size`` — истёкших больше нет.
+        """
+        pass
+
+    async def migrate(self, batch_size: int = 500) -> int:
+        """Перевести записи, оставшиеся от прежних форматов хранилища.
+
+        Выполняется один раз при запуске; повторный вызов после успешного
+        переноса ничего не делает. Возвращает количество переведённых сессий.
+        Хранилищам без прежних форматов переопределять не нужно.
+        """
+        return 0
+
     @abstractmethod
     async def add_participant(
         self,
         session_id: UUID,
         participant: SessionParticipant,
-    ) -> Session:
-        """Добавить участника в сессию."""
+    ) -> bool:
+        """Добавить участника в сессию.
+
+        Возвращает False, если пользователь уже участвует.
+        Бросает ValueError, если сессия не найдена.
+        """
         pass
 
     @abstractmethod
@@ -55,6 +98,20 @@ class SessionRepository(ABC):
         self,
         session_id: UUID,
         user_id: int,
-    ) -> Session:
-        """Удалить участника из сессии."""
+    ) -> bool:
+        """Удалить участника из сессии.
+
+        Возвращает False, если пользователь не участвовал.
+        Бросает ValueError, если сессия не найдена.
+        """
+        pass
+
+    @abstractmethod
+    async def participant_count(self, session_id: UUID) -> int:
+        """Количество участников сессии (0, если сессии нет)."""
+        pass
+
+    @abstractmethod
+    async def is_participant(self, session_id: UUID, user_id: int) -> bool:
+        """Участвует ли пользователь в сессии."""
         pass
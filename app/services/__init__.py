@@ -1,3 +1,6 @@
+from app.services.fragment_service import FragmentService
+from app.services.prefetch_service import FragmentPrefetcher
 from app.services.session_service import SessionService
+from app.services.session_sweeper import SessionSweeper
 
-__all__ = ["SessionService"]
+__all__ = ["FragmentPrefetcher", "FragmentService", "SessionService", "SessionSweeper"]
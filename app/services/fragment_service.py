@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.utils.async_viewer import AsyncTileViewer
+from app.utils.metrics import FRAGMENT_REQUESTS
+from app.utils.viewer import Point
+
+logger = logging.getLogger(__name__)
+
+
+class LocalFragmentCache:
+    """LRU-кэш закодированных фрагментов в памяти процесса с ограничением по байтам."""
+
+    def __init__(self, max_memory_mb: float = 16):
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._resident_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._resident_bytes -= len(previous)
+            while self._cache and self._resident_bytes + len(data) > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._resident_bytes -= len(evicted)
+            self._cache[key] = data
+            self._resident_bytes += len(data)
+
+
+class FragmentService:
+    """Сервис отрисовки фрагментов карты с кэшированием результата.
+
+    Готовые JPEG хранятся в Redis с TTL и в локальном LRU-кэше процесса.
+    Ключ строится по пиксельной точке карты на уровне масштаба и параметрам
+    отрисовки, поэтому координаты, попадающие в один пиксель, дают один ключ.
+    Одновременные запросы одного ключа объединяются в одну отрисовку.
+    """
+
+    KEY_PREFIX = "fragment:"
+
+    def __init__(
+        self,
+        viewer: AsyncTileViewer,
+        redis_client: Redis,
+        ttl_seconds: int = 3600,
+        local_cache_mb: float = 16,
+    ):
+        self.viewer = viewer
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.local_cache = LocalFragmentCache(local_cache_mb)
+        self._inflight: dict[str, asyncio.Task[bytes]] = {}
+
+    def _get_key(
+        self,
+        world_point: Point,
+        size_x: int,
+        size_y: int,
+        show_dot: bool,
+        dot_color: str,
+        zoom: int,
+        scale: float,
+        show_points: bool,
+    ) -> str:
+        """Сформировать ключ фрагмента в Redis."""
+        pixel = self.viewer.viewer.center_pixel(world_point, zoom)
+        return (
+            f"{self.KEY_PREFIX}{pixel.x}:{pixel.y}:{size_x}x{size_y}:"
+            f"{int(show_dot)}:{dot_color.lower()}:z{zoom}:s{scale:g}:p{int(show_points)}"
+        )
+
+    async def render(
+        self,
+        world_point: Point,
+        size_x: int = 700,
+        size_y: int = 700,
+        show_dot: bool = True,
+        dot_color: str = "green",
+        zoom: int = 0,
+        scale: float = 1.0,
+        show_points: bool = False,
+    ) -> bytes:
+        """Получить JPEG фрагмента карты из кэша или отрисовать его.
+
+        ``show_points`` наносит точки из индекса просмотрщика; такие фрагменты
+        кэшируются отдельно и обновляются по истечении TTL.
+        """
+        key = self._get_key(world_point, size_x, size_y, show_dot, dot_color, zoom, scale, show_points)
+
+        data = self.local_cache.get(key)
+        if data is not None:
+            FRAGMENT_REQUESTS.inc(source="local")
+            return data
+
+        # Отрисовка идёт в отдельной задаче: отмена одного из ожидающих
+        # не прерывает её для остальных
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._load_or_render(key, world_point, size_x, size_y, show_dot, dot_color, zoom, scale,
+                                     show_points),
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task[bytes]) -> None:
+        del self._inflight[key]
+        if not task.cancelled() and task.exception() is None:
+            self.local_cache.set(key, task.result())
+
+    async def _load_or_render(
+        self,
+        key: str,
+        world_point: Point,
+        size_x: int,
+        size_y: int,
+        show_dot: bool,
+        dot_color: str,
+        zoom: int,
+        scale: float,
+        show_points: bool,
+    ) -> bytes:
+        try:
+            data = await self.redis.get(key)
+        except RedisError as e:
+            logger.warning(f"Fragment cache read failed for {key}: {e}")
+            data = None
+        if data is not None:
+            FRAGMENT_REQUESTS.inc(source="redis")
+            return data
+
+        FRAGMENT_REQUESTS.inc(source="render")
+        data = await self.viewer.render_fragment(world_point, size_x, size_y, show_dot, dot_color, zoom, scale,
+                                                 show_points)
+        try:
+            await self.redis.set(key, data, ex=self.ttl_seconds)
+        except RedisError as e:
+            logger.warning(f"Fragment cache write failed for {key}: {e}")
+        return data
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any, Sequence
+
+from app.services.fragment_service import FragmentService
+from app.utils.viewer import Point
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _SessionBuffer:
+    points: Sequence[Point]
+    render_kwargs: dict[str, Any]
+    owner: object | None = None
+    expiry: asyncio.TimerHandle | None = None
+    tasks: OrderedDict[int, asyncio.Task[bytes]] = field(default_factory=OrderedDict)
+
+
+class FragmentPrefetcher:
+    """Упреждающая отрисовка следующих точек активных сессий.
+
+    Для каждой сессии в фоне рендерятся ``depth`` точек после текущей,
+    так что переключение на следующую точку сводится к загрузке готового JPEG.
+    Буфер сессии ограничен ``depth`` задачами и удаляется вызовом ``drop``/``release``
+    или сам в момент окончания сессии ``ends_at``.
+    """
+
+    def __init__(self, fragments: FragmentService, depth: int = 3):
+        self.fragments = fragments
+        self.depth = depth
+        self._buffers: dict[str, _SessionBuffer] = {}
+
+    def start(self, session_id: object, points: Sequence[Point], ends_at: datetime | None = None,
+              **render_kwargs: Any) -> None:
+        """Зарегистрировать последовательность точек сессии и начать упреждающую отрисовку.
+
+        Буфер с ``ends_at`` удаляется в момент окончания сессии.
+        """
+        self.drop(session_id)
+        if not points:
+            return
+        key = str(session_id)
+        buffer = self._buffers[key] = _SessionBuffer(points=points, render_kwargs=render_kwargs)
+        if ends_at is not None:
+            delay = max((ends_at - datetime.now(tz=UTC)).total_seconds(), 0)
+            buffer.expiry = asyncio.get_running_loop().call_later(delay, self.drop, key)
+        self._schedule(key, 0)
+
+    def attach(self, session_id: object, owner: object) -> None:
+        """Запомнить view, которое сейчас показывает сессию."""
+        buffer = self._buffers.get(str(session_id))
+        if buffer is not None:
+            buffer.owner = owner
+
+    def release(self, session_id: object, owner: object) -> None:
+        """Удалить буфер, если view-владелец не сменился (например, по таймауту view)."""
+        buffer = self._buffers.get(str(session_id))
+        if buffer is not None and buffer.owner is owner:
+            self.drop(session_id)
+
+    def drop(self, session_id: object) -> None:
+        """Отменить упреждающую отрисовку и удалить буфер сессии."""
+        buffer = self._buffers.pop(str(session_id), None)
+        if buffer is None:
+            return
+        if buffer.expiry is not None:
+            buffer.expiry.cancel()
+        for task in buffer.tasks.values():
+            task.cancel()
+
+    async def get(self, session_id: object, index: int) -> bytes:
+        """Получить JPEG точки с номером ``index`` и запланировать следующие.
+
+        Номер берётся по модулю длины последовательности.
+        """
+        key = str(session_id)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            raise KeyError(f"Session {session_id} has no prefetch buffer")
+
+        index %= len(buffer.points)
+        task = buffer.tasks.pop(index, None)
+        self._schedule(key, index + 1)
+
+        if task is not None:
+            try:
+                # shield: отмена вызывающего не должна отменять отрисовку, и наоборот
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # Отменили самого вызывающего, а не задачу упреждения
+                if not task.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                logger.debug(f"Prefetch of point {index} for session {key} was cancelled, rendering directly")
+            except Exception as e:
+                logger.warning(f"Prefetch of point {index} for session {key} failed: {e}")
+
+        return await self.fragments.render(buffer.points[index], **buffer.render_kwargs)
+
+    def _schedule(self, key: str, start: int) -> None:
+        buffer = self._buffers[key]
+        count = len(buffer.points)
+        wanted = [(start + offset) % count for offset in range(min(self.depth, count))]
+
+        # Задачи вне окна упреждения больше не нужны
+        for index in [i for i in buffer.tasks if i not in wanted]:
+            buffer.tasks.pop(index).cancel()
+
+        for index in wanted:
+            if index not in buffer.tasks:
+                buffer.tasks[index] = asyncio.create_task(
+                    self.fragments.render(buffer.points[index], **buffer.render_kwargs),
+                    name=f"prefetch:{key}:{index}",
+                )
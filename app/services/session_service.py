@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta, UTC
+from typing import AsyncIterator
 from uuid import UUID, uuid4
 
 from pydantic_extra_types.color import Color
@@ -71,6 +72,10 @@ class SessionService:
         """Получить все сессии."""
         return await self.repository.get_all()
 
+    def iter_sessions(self, batch_size: int = 500) -> AsyncIterator[Session]:
+        """Перебрать все сессии постранично."""
+        return self.repository.iter_sessions(batch_size)
+
     async def update_session(
         self,
         session_id: UUID,
@@ -127,17 +132,17 @@ class SessionService:
 
     async def is_session_active(self, session_id: UUID) -> bool:
         """Проверить, активна ли сессия (не истекло ли время)."""
-        session = await self.get_session(session_id)
-        if not session:
+        ends_at = await self.repository.get_ends_at(session_id)
+        if ends_at is None:
             return False
-        return datetime.utcnow() < session.ends_at
+        return datetime.now(tz=UTC) < ends_at
 
     async def join_session(
         self,
         session_id: UUID,
         user_id: int,
         username: str,
-    ) -> Session:
+    ) -> bool:
         """Добавить участника в сессию.
 
         Args:
@@ -146,15 +151,11 @@ class SessionService:
             username: Имя пользователя
 
         Returns:
-            Обновлённую сессию
+            True, если пользователь добавлен, False, если уже участвует
 
         Raises:
             ValueError: Если сессия не найдена
         """
-        session = await self.get_session(session_id)
-        if not session:
-            raise ValueError(f"Session with id {session_id} not found")
-
         now = datetime.now(tz=UTC)
         participant = SessionParticipant(
             user_id=user_id,
@@ -167,7 +168,7 @@ class SessionService:
         self,
         session_id: UUID,
         user_id: int,
-    ) -> Session:
+    ) -> bool:
         """Удалить участника из сессии.
 
         Args:
@@ -175,9 +176,17 @@ class SessionService:
             user_id: ID пользователя
 
         Returns:
-            Обновлённую сессию
+            True, если пользователь удалён, False, если не участвовал
 
         Raises:
             ValueError: Если сессия не найдена
         """
         return await self.repository.remove_participant(session_id, user_id)
+
+    async def participant_count(self, session_id: UUID) -> int:
+        """Количество участников сессии."""
+        return await self.repository.participant_count(session_id)
+
+    async def is_participant(self, session_id: UUID, user_id: int) -> bool:
+        """Участвует ли пользователь в сессии."""
+        return await self.repository.is_participant(session_id, user_id)
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from datetime import UTC, datetime
+
+from app.repositories.session_repository import SessionRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SessionSweeper:
+    """Фоновая очистка индексов от истёкших сессий.
+
+    Данные сессий удаляет само хранилище (в Redis — по EXPIREAT), а
+    сборщик раз в ``interval_seconds`` убирает их id из индексов пачками
+    по ``batch_size``, чтобы индексы не росли с каждой новой сессией.
+
+    При запуске сборщик вызывает ``migrate`` хранилища: сессии прежнего
+    формата в Redis получают EXPIREAT и запись в индексе по ends_at, без
+    которых они не истекли бы никогда.
+    """
+
+    def __init__(
+        self,
+        repository: SessionRepository,
+        interval_seconds: float = 60,
+        batch_size: int = 500,
+    ):
+        self.repository = repository
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+    async def sweep(self) -> int:
+        """Убрать все истёкшие на текущий момент сессии. Возвращает их количество."""
+        now = datetime.now(tz=UTC)
+        total = 0
+        while True:
+            removed = await self.repository.remove_expired(now, self.batch_size)
+            total += removed
+            if removed < self.batch_size:
+                return total
+
+    async def _run(self) -> None:
+        try:
+            migrated = await self.repository.migrate(self.batch_size)
+            if migrated:
+                logger.info(f"Migrated {migrated} sessions from the legacy format")
+        except Exception:
+            logger.exception("Session migration failed")
+        while True:
+            try:
+                removed = await self.sweep()
+                if removed:
+                    logger.info(f"Removed {removed} expired sessions from index")
+            except Exception:
+                logger.exception("Session sweep failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        """Запустить очистку в фоне. Повторный вызов ничего не делает."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="session-sweeper")
+
+    async def stop(self) -> None:
+        """Остановить фоновую очистку."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import AsyncIterator, Iterable, Literal, Optional, Sequence, Tuple
+
+from app.utils.viewer import BatchTileLoader, FragmentPlan, GTAVTileViewer, Point
+
+logger = logging.getLogger(__name__)
+
+ExecutorKind = Literal["thread", "process"]
+
+# Экземпляр просмотрщика внутри процесса пула (для executor="process")
+_worker_viewer: Optional[GTAVTileViewer] = None
+
+
+def _init_worker(viewer: GTAVTileViewer) -> None:
+    global _worker_viewer
+    _worker_viewer = viewer
+
+
+def _render_in_worker(world_point: Point, size_x: int, size_y: int, show_dot: bool,
+                      dot_color: str, zoom: int, scale: float, show_points: bool) -> bytes:
+    return _worker_viewer.get_fragment_bytes(world_point, size_x, size_y, show_dot, dot_color, zoom, scale,
+                                             show_points=show_points)
+
+
+def _render_many_in_worker(points: Sequence[Point], size_x: int, size_y: int, show_dot: bool,
+                           dot_color: str, zoom: int, scale: float) -> list[Tuple[int, bytes]]:
+    return list(_worker_viewer.render_many_bytes(points, size_x, size_y, show_dot, dot_color, zoom, scale))
+
+
+class AsyncTileViewer:
+    """Асинхронная обёртка над GTAVTileViewer.
+
+    Декодирование тайлов, склейка, масштабирование и кодирование JPEG
+    выполняются в пуле потоков или процессов, не блокируя event loop.
+    """
+
+    def __init__(
+        self,
+        viewer: GTAVTileViewer,
+        executor: ExecutorKind = "thread",
+        max_workers: int | None = None,
+        max_concurrency: int | None = None,
+    ):
+        self.viewer = viewer
+        self.executor_kind = executor
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = self._create_executor(executor, max_workers)
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    def _create_executor(self, kind: ExecutorKind, max_workers: int | None) -> Executor:
+        if kind == "process":
+            # Каждый процесс получает копию просмотрщика со своим кэшем тайлов
+            return ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(self.viewer,),
+            )
+        if kind == "thread":
+            return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tile-render")
+        raise ValueError(f"Unknown executor kind: {kind}")
+
+    async def render_fragment(
+        self,
+        world_point: Point,
+        size_x: int = 700,
+        size_y: int = 700,
+        show_dot: bool = True,
+        dot_color: str = "green",
+        zoom: int = 0,
+        scale: float = 1.0,
+        show_points: bool = False,
+    ) -> bytes:
+        """Отрисовать фрагмент карты и вернуть его в виде JPEG."""
+        if self.executor_kind == "process":
+            job = partial(_render_in_worker, world_point, size_x, size_y, show_dot, dot_color, zoom, scale,
+                          show_points)
+        else:
+            job = partial(
+                self.viewer.get_fragment_bytes, world_point, size_x, size_y, show_dot, dot_color, zoom, scale,
+                show_points=show_points,
+            )
+
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            return await loop.run_in_executor(self._executor, job)
+        async with self._semaphore:
+            return await loop.run_in_executor(self._executor, job)
+
+    async def render_many(
+        self,
+        points: Sequence[Point],
+        size_x: int = 700,
+        size_y: int = 700,
+        show_dot: bool = True,
+        dot_color: str = "green",
+        zoom: int = 0,
+        scale: float = 1.0,
+    ) -> AsyncIterator[Tuple[int, bytes]]:
+        """Отрисовать фрагменты для набора точек, отдавая ``(индекс, JPEG)`` по мере готовности."""
+        if self.executor_kind == "process":
+            async for item in self._render_many_in_processes(points, size_x, size_y, show_dot, dot_color,
+                                                             zoom, scale):
+                yield item
+            return
+
+        loop = asyncio.get_running_loop()
+        plans = self.viewer.plan_many(points, size_x, size_y, zoom, scale)
+        loader = BatchTileLoader(self.viewer, (plan for _, plan in plans))
+        queued = iter(plans)
+        stopped = threading.Event()
+
+        def render(plan: FragmentPlan) -> bytes | None:
+            # После остановки потребителя ещё не начатые отрисовки пропускаются
+            if stopped.is_set():
+                return None
+            return self.viewer.render_plan_bytes(plan, show_dot, dot_color, loader)
+
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        # Точки отправляются в общий пул не больше max_workers за раз, чтобы
+        # пакет не занимал очередь пула впереди одиночных запросов
+        pending: dict[asyncio.Future, int] = {}
+        try:
+            while True:
+                for index, plan in islice(queued, self.max_workers - len(pending)):
+                    pending[loop.run_in_executor(self._executor, render, plan)] = index
+                if not pending:
+                    return
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            stopped.set()
+            self._release_after(pending)
+
+    def _release_after(self, futures: Iterable[asyncio.Future]) -> None:
+        # Слот семафора освобождается, когда закончатся уже начатые отрисовки
+        if self._semaphore is None:
+            return
+        futures = list(futures)
+        if not futures:
+            self._semaphore.release()
+            return
+        remaining = len(futures)
+
+        def done(future: asyncio.Future) -> None:
+            nonlocal remaining
+            if not future.cancelled():
+                future.exception()
+            remaining -= 1
+            if remaining == 0:
+                self._semaphore.release()
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    async def _render_many_in_processes(
+        self,
+        points: Sequence[Point],
+        size_x: int,
+        size_y: int,
+        show_dot: bool,
+        dot_color: str,
+        zoom: int,
+        scale: float,
+    ) -> AsyncIterator[Tuple[int, bytes]]:
+        # Точки делятся на непрерывные куски по числу процессов: соседние точки
+        # обычно делят тайлы, и каждый кусок декодирует их один раз
+        chunk_size = -(-len(points) // self.max_workers) or 1
+
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        submitted: list[Future] = []
+        chunks: dict[asyncio.Future, int] = {}
+        try:
+            for offset in range(0, len(points), chunk_size):
+                job = partial(_render_many_in_worker, points[offset:offset + chunk_size], size_x, size_y,
+                              show_dot, dot_color, zoom, scale)
+                submitted.append(self._executor.submit(job))
+                chunks[asyncio.wrap_future(submitted[-1])] = offset
+
+            pending = set(chunks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for chunk in done:
+                    for index, data in chunk.result():
+                        yield chunks[chunk] + index, data
+        finally:
+            # Ещё не начатые куски отменяются, слот освобождается после уже начатых
+            for future in submitted:
+                future.cancel()
+            self._release_after(chunks)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Остановить пул воркеров."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
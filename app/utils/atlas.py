@@ -0,0 +1,117 @@
+import io
+import logging
+import struct
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+from PIL import Image
+
+from app.utils.viewer import GTAVTileViewer
+
+logger = logging.getLogger(__name__)
+
+ATLAS_MAGIC = b"WPATLAS1"
+# magic, ширина, высота, число каналов; заголовок выровнен до 64 байт
+ATLAS_HEADER = struct.Struct("<8sIII")
+ATLAS_HEADER_SIZE = 64
+
+
+def atlas_path(tiles_dir: Path, level: int = 0) -> Path:
+    return tiles_dir / f"atlas_{level}.raw"
+
+
+class RasterAtlas:
+    """Несжатый растр уровня карты, отображённый в память.
+
+    Окно фрагмента вырезается срезом массива без декодирования тайлов,
+    роль кэша тайлов выполняет страничный кэш ОС.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            magic, self.width, self.height, self.channels = ATLAS_HEADER.unpack(f.read(ATLAS_HEADER.size))
+        if magic != ATLAS_MAGIC:
+            raise ValueError(f"{self.path} is not a raster atlas")
+
+        self._array = np.memmap(
+            self.path,
+            dtype=np.uint8,
+            mode="r",
+            offset=ATLAS_HEADER_SIZE,
+            shape=(self.height, self.width, self.channels),
+        )
+
+    def __getstate__(self) -> dict:
+        # В дочерние процессы передаётся только путь, отображение открывается заново
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"])
+
+    def read_window(self, left: int, top: int, right: int, bottom: int) -> Image.Image:
+        window = np.ascontiguousarray(self._array[top:bottom, left:right])
+        return Image.fromarray(window, "RGB")
+
+    @classmethod
+    def build(cls, viewer: GTAVTileViewer, path: Path, level: int = 0) -> "RasterAtlas":
+        """Собрать растр уровня ``level`` из тайлов просмотрщика."""
+        tile_size = viewer.TILE_SIZE
+        origin_x, origin_y = viewer._level_origin(level)
+        columns = -(-viewer.width_tiles >> level)
+        rows = -(-viewer.height_tiles >> level)
+        width, height = columns * tile_size, rows * tile_size
+
+        with path.open("wb") as f:
+            f.write(ATLAS_HEADER.pack(ATLAS_MAGIC, width, height, 3).ljust(ATLAS_HEADER_SIZE, b"\0"))
+
+            # Растр пишется полосами высотой в один тайл
+            band = np.zeros((tile_size, width, 3), dtype=np.uint8)
+            for row in range(rows):
+                band.fill(0)
+                for column in range(columns):
+                    data = viewer.source.read(origin_x + column, origin_y + row, level)
+                    if data is None:
+                        continue
+                    with Image.open(io.BytesIO(data)) as tile_image:
+                        left = column * tile_size
+                        band[:, left:left + tile_size] = np.asarray(tile_image.convert("RGB"))
+                f.write(band.data)
+
+        logger.info(f"Wrote {width}x{height} atlas for level {level} to {path}")
+        return cls(path)
+
+    @classmethod
+    def open_levels(cls, tiles_dir: Path, levels: int) -> Dict[int, "RasterAtlas"]:
+        """Открыть все собранные растры уровней из директории с тайлами."""
+        return {
+            level: cls(atlas_path(tiles_dir, level))
+            for level in range(levels)
+            if atlas_path(tiles_dir, level).exists()
+        }
+
+
+def main() -> None:
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    parser = argparse.ArgumentParser(description="Build memory-mapped raster atlas from GTA V map tiles")
+    parser.add_argument("tiles_dir", nargs="?", default="assets/map",
+                        help="Directory containing map tiles")
+    parser.add_argument("-l", "--level", type=int, action="append", default=None,
+                        help="Pyramid level to convert (can be repeated, default: 0)")
+
+    args = parser.parse_args()
+
+    tiles_dir = Path(args.tiles_dir)
+    viewer = GTAVTileViewer(str(tiles_dir))
+    for level in args.level or [0]:
+        if level >= viewer.levels:
+            parser.error(f"Level {level} is not built, run app.utils.pyramid first")
+        RasterAtlas.build(viewer, atlas_path(tiles_dir, level), level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import base64
+import json
+import logging
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+PYRAMID_DIR = "pyramid"
+
+
+@dataclass(frozen=True)
+class TileManifest:
+    """Компактное описание набора тайлов: границы сетки и битовая карта наличия.
+
+    Бит с индексом ``(x - min_x) * height + (y - min_y)`` установлен,
+    если тайл ``<x>/<y>`` существует. ``levels`` — число уровней пирамиды,
+    включая исходный (см. ``app.utils.pyramid``).
+    """
+
+    min_x: int
+    max_x: int
+    min_y: int
+    max_y: int
+    tile_size: int
+    bitmap: bytes
+    levels: int = 1
+
+    @property
+    def width(self) -> int:
+        return self.max_x - self.min_x + 1
+
+    @property
+    def height(self) -> int:
+        return self.max_y - self.min_y + 1
+
+    def _bit_index(self, x: int, y: int) -> int:
+        return (x - self.min_x) * self.height + (y - self.min_y)
+
+    def has(self, x: int, y: int) -> bool:
+        if not (self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y):
+            return False
+        index = self._bit_index(x, y)
+        return bool(self.bitmap[index >> 3] & (1 << (index & 7)))
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        return self.has(*key)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for x in range(self.min_x, self.max_x + 1):
+            for y in range(self.min_y, self.max_y + 1):
+                if self.has(x, y):
+                    yield x, y
+
+    def __len__(self) -> int:
+        return sum(bin(byte).count("1") for byte in self.bitmap)
+
+    def level_tiles(self, level: int) -> set[Tuple[int, int]]:
+        """Тайлы уровня пирамиды, координаты отсчитываются от левого верхнего тайла."""
+        return {((x - self.min_x) >> level, (y - self.min_y) >> level) for x, y in self}
+
+    @classmethod
+    def from_tiles(cls, tiles: set[Tuple[int, int]], tile_size: int) -> "TileManifest":
+        if not tiles:
+            raise ValueError("No tiles found in directory")
+
+        xs = [x for x, _ in tiles]
+        ys = [y for _, y in tiles]
+        min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+        height = max_y - min_y + 1
+
+        bitmap = bytearray(((max_x - min_x + 1) * height + 7) // 8)
+        for x, y in tiles:
+            index = (x - min_x) * height + (y - min_y)
+            bitmap[index >> 3] |= 1 << (index & 7)
+
+        return cls(min_x, max_x, min_y, max_y, tile_size, bytes(bitmap))
+
+    @classmethod
+    def scan(cls, tiles_dir: Path, tile_size: int = 256) -> "TileManifest":
+        tiles = set()
+        for x_dir in tiles_dir.iterdir():
+            if not x_dir.is_dir():
+                continue
+
+            try:
+                x = int(x_dir.name)
+            except ValueError:
+                continue
+
+            for tile_path in x_dir.glob("*.jpg"):
+                try:
+                    tiles.add((x, int(tile_path.stem)))
+                except ValueError:
+                    continue
+
+        return cls.from_tiles(tiles, tile_size)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "TileManifest":
+        data = json.loads(raw)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version: {data.get('version')}")
+
+        min_x, min_y, max_x, max_y = data["bounds"]
+        return cls(
+            min_x=min_x,
+            max_x=max_x,
+            min_y=min_y,
+            max_y=max_y,
+            tile_size=data["tile_size"],
+            bitmap=zlib.decompress(base64.b64decode(data["bitmap"])),
+            levels=data.get("levels", 1),
+        )
+
+    def to_json(self) -> str:
+        data = {
+            "version": MANIFEST_VERSION,
+            "tile_size": self.tile_size,
+            "bounds": [self.min_x, self.min_y, self.max_x, self.max_y],
+            "bitmap": base64.b64encode(zlib.compress(self.bitmap, 9)).decode(),
+            "levels": self.levels,
+        }
+        return json.dumps(data)
+
+    @classmethod
+    def load(cls, path: Path) -> "TileManifest":
+        return cls.from_json(path.read_text())
+
+    def save(self, path: Path) -> None:
+        path.write_text(self.to_json())
+
+
+def main() -> None:
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    parser = argparse.ArgumentParser(description="Build GTA V map tile manifest")
+    parser.add_argument("tiles_dir", nargs="?", default="assets/map",
+                        help="Directory containing map tiles")
+    parser.add_argument("-o", "--output", default=None,
+                        help=f"Output file (default: <tiles_dir>/{MANIFEST_NAME})")
+    parser.add_argument("--tile-size", type=int, default=256,
+                        help="Tile size in pixels")
+
+    args = parser.parse_args()
+
+    tiles_dir = Path(args.tiles_dir)
+    output = Path(args.output) if args.output else tiles_dir / MANIFEST_NAME
+
+    manifest = TileManifest.scan(tiles_dir, args.tile_size)
+    manifest.save(output)
+    logger.info(f"Wrote manifest for {len(manifest)} tiles "
+                f"({manifest.width}x{manifest.height}) to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import bisect
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Literal, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм времени, секунды
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (16_384, 65_536, 131_072, 262_144, 524_288, 1_048_576, 2_097_152, 4_194_304, 8_388_608)
+
+Sample = Tuple[str, dict, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """Метрика с метками; значения хранятся отдельно для каждого набора меток.
+
+    Все операции потокобезопасны: отрисовка пишет метрики из пула потоков.
+    """
+
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}") from e
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]:
+        """Значения метрики в виде ``(имя, метки, значение)``."""
+        pass
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Счётчики корзин (последняя — +Inf), сумма и количество
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class CallbackMetric(Metric):
+    """Метрика, значения которой читаются при каждом сборе (статистика кэшей, пулов)."""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Iterable[Tuple[dict, float]]],
+                 kind: Literal["gauge", "counter"] = "gauge"):
+        super().__init__(name, documentation)
+        self.TYPE = kind
+        self.callback = callback
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, value in self.callback():
+            yield self.name, labels, value
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                logger.exception(f"Failed to collect metric {metric.name}")
+                continue
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+@contextmanager
+def span(metric: Histogram, **labels: object) -> Iterator[dict]:
+    """Записать длительность блока в гистограмму.
+
+    Метки можно поменять внутри блока через возвращённый словарь; метка
+    ``status``, если она есть, при исключении получает значение ``error``.
+    """
+    started = time.perf_counter()
+    try:
+        yield labels
+    except BaseException:
+        if "status" in labels:
+            labels["status"] = "error"
+        raise
+    finally:
+        metric.observe(time.perf_counter() - started, **labels)
+
+
+COMMAND_SECONDS = histogram(
+    "waypoint_command_seconds", "Slash command and component callback latency",
+    ["command", "status"],
+)
+STAGE_SECONDS = histogram(
+    "waypoint_interaction_stage_seconds", "Latency of interaction stages: defer, create, render, upload",
+    ["command", "stage"],
+)
+RENDER_SECONDS = histogram(
+    "waypoint_render_seconds", "Fragment rendering stages: tile decode, compose, resize, points, encode",
+    ["stage"],
+)
+FRAGMENT_BYTES = histogram("waypoint_fragment_bytes", "Encoded JPEG fragment size", buckets=BYTES_BUCKETS)
+FRAGMENT_REQUESTS = counter(
+    "waypoint_fragment_requests_total", "Fragment requests by where the JPEG came from", ["source"],
+)
+REDIS_SECONDS = histogram(
+    "waypoint_redis_command_seconds", "Redis round trips: single commands and pipelines", ["command"],
+)
+
+
+class MetricsServer:
+    """HTTP-эндпоинт ``/metrics`` с метриками реестра в формате Prometheus."""
+
+    def __init__(self, registry: Registry = REGISTRY, host: str = "0.0.0.0", port: int = 5001):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional["web.AppRunner"] = None
+
+    async def _handle(self, request: "web.Request") -> "web.Response":
+        from aiohttp import web
+
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def start(self) -> None:
+        if self._runner is not None:
+            return
+        # aiohttp приходит вместе с disnake; модуль метрик импортируется и в
+        # процессах отрисовки, где сервер не нужен
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
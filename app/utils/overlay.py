@@ -0,0 +1,58 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+Color = Tuple[int, int, int]
+
+
+def _disk_offsets(radius: int) -> np.ndarray:
+    span = np.arange(-radius, radius + 1)
+    dx, dy = np.meshgrid(span, span)
+    mask = dx * dx + dy * dy <= radius * radius
+    return np.stack([dx[mask], dy[mask]], axis=-1)
+
+
+def draw_route(
+    image: Image.Image,
+    pixels: np.ndarray,
+    labels: Optional[Sequence[Optional[str]]] = None,
+    line_color: Color = (255, 200, 0),
+    marker_color: Color = (255, 0, 0),
+    label_color: Color = (255, 255, 255),
+    line_width: int = 2,
+    marker_radius: int = 3,
+    connect: bool = True,
+) -> None:
+    """Нарисовать маршрут по точкам ``pixels`` (массив N×2 в пикселях изображения).
+
+    Ломаная рисуется одним вызовом ``line``, маркеры всех точек — одним вызовом
+    ``point`` по заранее размноженному трафарету круга. Подписи выводятся
+    только для точек, попавших в изображение. При ``connect=False`` рисуются
+    только маркеры.
+    """
+    if len(pixels) == 0:
+        return
+
+    draw = ImageDraw.Draw(image)
+    points = np.rint(pixels).astype(np.int64)
+
+    if connect and len(points) > 1:
+        draw.line(points.ravel().tolist(), fill=line_color, width=line_width, joint="curve")
+
+    width, height = image.size
+    visible = (
+        (points[:, 0] >= 0) & (points[:, 0] < width)
+        & (points[:, 1] >= 0) & (points[:, 1] < height)
+    )
+
+    markers = (points[visible, None, :] + _disk_offsets(marker_radius)[None, :, :]).reshape(-1, 2)
+    draw.point(markers.ravel().tolist(), fill=marker_color)
+
+    if labels is None:
+        return
+    for index in np.flatnonzero(visible):
+        label = labels[index]
+        if label:
+            x, y = points[index]
+            draw.text((int(x) + marker_radius + 2, int(y) - marker_radius - 10), label, fill=label_color)
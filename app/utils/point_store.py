@@ -0,0 +1,297 @@
+import json
+import logging
+import math
+import re
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, Optional
+from uuid import UUID
+
+import numpy as np
+
+from app.models.gta import Point
+from app.utils.spatial import PointIndex
+
+logger = logging.getLogger(__name__)
+
+# Уровень None хранится в целочисленной колонке как отдельное значение
+LEVEL_NONE = np.iinfo(np.int32).min
+# Номер None хранится как отсутствующее значение строковой колонки, отличное от ""
+NUMBER_DTYPE = np.dtypes.StringDType(na_object=None)
+
+_SEPARATOR = re.compile(r"\s*([,\]])\s*")
+
+
+def iter_json_array(stream: IO[str], chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Разобрать JSON-массив верхнего уровня поэлементно, читая поток кусками.
+
+    В памяти одновременно находится только текущий кусок и разбираемый
+    элемент. Пустой поток считается пустым массивом.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def peek() -> str:
+        # Первый непробельный символ с позиции pos, при необходимости дочитывая поток
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, pos = chunk, 0
+
+    def read_more() -> None:
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    first = peek()
+    if not first:
+        return
+    if first != "[":
+        raise ValueError(f"Expected a JSON array, got {first!r}")
+    pos += 1
+
+    if peek() == "]":
+        return
+
+    while True:
+        if pos >= len(buffer) or buffer[pos].isspace():
+            peek()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                read_more()
+                continue
+            # Значение без разделителя после него могло быть обрезано
+            # границей куска (например, число "2" от "2.5")
+            separator = _SEPARATOR.match(buffer, end)
+            if separator is None and not eof:
+                read_more()
+                continue
+            break
+
+        if separator is None:
+            raise ValueError("Expected ',' or ']' after JSON array element")
+
+        yield item
+        pos = separator.end()
+        if separator.group(1) == "]":
+            return
+
+
+def _uuid_bytes(value: str) -> bytes:
+    # Быстрый разбор канонической строки UUID без создания объекта UUID
+    raw = bytes.fromhex(value.replace("-", ""))
+    if len(raw) != 16:
+        raise ValueError(f"Invalid UUID: {value!r}")
+    return raw
+
+
+class PointStore:
+    """Колоночное хранилище точек карты.
+
+    Числовые поля лежат в структурированном массиве NumPy, номера — в
+    строковой колонке, строка по UUID находится через словарь. Модели
+    ``Point`` создаются только по запросу (``view``/``get``) и без
+    повторной валидации. Хранилище ведёт собственный ``PointIndex``.
+    """
+
+    DTYPE = np.dtype([
+        ("uuid", np.uint8, 16),
+        ("x", np.float64),
+        ("y", np.float64),
+        ("z", np.float64),
+        ("level", np.int32),
+    ])
+
+    def __init__(self, capacity: int = 1024, cell_size: float = 250.0):
+        capacity = max(capacity, 1)
+        self._rows = np.zeros(capacity, dtype=self.DTYPE)
+        self._numbers = np.full(capacity, "", dtype=NUMBER_DTYPE)
+        self._size = 0
+        self._by_uuid: dict[bytes, int] = {}
+        self.index = PointIndex(self, cell_size)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, point_uuid: UUID) -> bool:
+        return point_uuid.bytes in self._by_uuid
+
+    # Колонки включают незаполненный хвост ёмкости; номера строк из индекса
+    # всегда указывают на заполненную часть
+
+    @property
+    def x(self) -> np.ndarray:
+        return self._rows["x"]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._rows["y"]
+
+    @property
+    def level(self) -> np.ndarray:
+        return self._rows["level"]
+
+    @property
+    def numbers(self) -> np.ndarray:
+        return self._numbers
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= len(self._rows):
+            return
+
+        capacity = max(needed, len(self._rows) * 2)
+        rows = np.zeros(capacity, dtype=self.DTYPE)
+        rows[:self._size] = self._rows[:self._size]
+        numbers = np.full(capacity, "", dtype=NUMBER_DTYPE)
+        numbers[:self._size] = self._numbers[:self._size]
+        self._rows, self._numbers = rows, numbers
+
+    def append(self, point_uuid: UUID, x: float, y: float, z: Optional[float] = None,
+               level: Optional[int] = 0, number: Optional[str] = "?") -> int:
+        """Добавить точку или обновить существующую с тем же UUID. Возвращает номер строки."""
+        row = self._by_uuid.get(point_uuid.bytes)
+        if row is not None:
+            self.index.remove(row, self._rows["x"][row], self._rows["y"][row])
+        else:
+            self._reserve(1)
+            row = self._size
+
+        record = self._rows[row]
+        record["uuid"] = np.frombuffer(point_uuid.bytes, dtype=np.uint8)
+        record["x"] = x
+        record["y"] = y
+        record["z"] = math.nan if z is None else z
+        record["level"] = LEVEL_NONE if level is None else level
+        self._numbers[row] = number
+
+        if row == self._size:
+            self._size += 1
+            self._by_uuid[point_uuid.bytes] = row
+        self.index.add(row, x, y)
+        return row
+
+    def add(self, point: Point) -> int:
+        return self.append(point.uuid, point.x, point.y, point.z, point.level, point.number)
+
+    def add_records(self, records: Iterable[dict], batch_size: int = 4096) -> int:
+        """Добавить точки из словарей в формате ``Point`` (как в ``points.json``).
+
+        Записи разбираются в колонки пачками по ``batch_size`` и копируются в
+        массивы и индекс одной операцией на пачку.
+        """
+        batch: list[tuple] = []
+        count = 0
+        for record in records:
+            try:
+                z = record.get("z")
+                level = record.get("level", 0)
+                number = record.get("number", "?")
+                batch.append((
+                    _uuid_bytes(record["uuid"]),
+                    float(record["x"]),
+                    float(record["y"]),
+                    math.nan if z is None else float(z),
+                    LEVEL_NONE if level is None else int(level),
+                    None if number is None else str(number),
+                ))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid point record #{count}: {e!r}") from e
+            count += 1
+
+            if len(batch) >= batch_size:
+                self._extend(batch)
+                batch = []
+
+        if batch:
+            self._extend(batch)
+        return count
+
+    def _extend(self, batch: list[tuple]) -> None:
+        # Новые UUID дописываются пачкой, повторы обновляют строки по одной
+        fresh = []
+        repeated = []
+        seen = set()
+        for item in batch:
+            key = item[0]
+            if key in self._by_uuid or key in seen:
+                repeated.append(item)
+            else:
+                seen.add(key)
+                fresh.append(item)
+
+        if fresh:
+            uuids, xs, ys, zs, levels, numbers = zip(*fresh)
+            count = len(fresh)
+            self._reserve(count)
+            start = self._size
+            rows = self._rows[start:start + count]
+            rows["uuid"] = np.frombuffer(b"".join(uuids), dtype=np.uint8).reshape(count, 16)
+            rows["x"] = xs
+            rows["y"] = ys
+            rows["z"] = zs
+            rows["level"] = levels
+            self._numbers[start:start + count] = numbers
+
+            self._size += count
+            self._by_uuid.update(zip(uuids, range(start, start + count)))
+            self.index.add_many(np.arange(start, start + count), rows["x"], rows["y"])
+
+        for uuid_bytes, x, y, z, level, number in repeated:
+            self.append(UUID(bytes=uuid_bytes), x, y, None if math.isnan(z) else z,
+                        None if level == LEVEL_NONE else level, number)
+
+    def row_of(self, point_uuid: UUID) -> Optional[int]:
+        return self._by_uuid.get(point_uuid.bytes)
+
+    def view(self, row: int) -> Point:
+        """Модель ``Point`` для строки хранилища."""
+        if not 0 <= row < self._size:
+            raise IndexError(f"Point row {row} out of range")
+
+        record = self._rows[row]
+        z = float(record["z"])
+        level = int(record["level"])
+        number = self._numbers[row]
+        return Point.model_construct(
+            uuid=UUID(bytes=record["uuid"].tobytes()),
+            x=float(record["x"]),
+            y=float(record["y"]),
+            z=None if math.isnan(z) else z,
+            level=None if level == LEVEL_NONE else level,
+            number=None if number is None else str(number),
+        )
+
+    def views(self, rows: Iterable[int]) -> list[Point]:
+        return [self.view(int(row)) for row in rows]
+
+    def get(self, point_uuid: UUID) -> Optional[Point]:
+        row = self._by_uuid.get(point_uuid.bytes)
+        return None if row is None else self.view(row)
+
+    @classmethod
+    def from_points(cls, points: Iterable[Point], cell_size: float = 250.0) -> "PointStore":
+        store = cls(cell_size=cell_size)
+        for point in points:
+            store.add(point)
+        return store
+
+    @classmethod
+    def load(cls, path: Path, cell_size: float = 250.0, chunk_size: int = 1 << 16) -> "PointStore":
+        """Загрузить ``points.json`` потоковым разбором, не строя моделей для каждой точки."""
+        store = cls(cell_size=cell_size)
+        with open(path, encoding="utf-8") as stream:
+            store.add_records(iter_json_array(stream, chunk_size))
+        logger.info(f"Loaded {len(store)} points from {path}")
+        return store
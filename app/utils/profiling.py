@@ -0,0 +1,225 @@
+import asyncio
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Callable, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+ProfileTarget = Tuple[type, str]
+
+# Сами модули профилирования не должны попадать в статистику памяти
+_MEMORY_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, __file__),
+)
+
+
+@dataclass
+class ProfileRun:
+    """Один запуск профилирования: следующие ``calls`` вызовов целей."""
+
+    directory: Path
+    calls: int
+    memory: bool
+    captured: int = 0
+    skipped: int = 0
+    summary: str = ""
+    _files: list[Path] = field(default_factory=list)
+    _done: asyncio.Event = field(default_factory=asyncio.Event)
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """Дождаться, пока будут сняты все вызовы. ``False`` — истёк таймаут."""
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+
+class Profiler:
+    """Профилирование по запросу через подмену методов ``targets``.
+
+    Пока запуск не взведён, у классов целей исходные методы и никаких
+    накладных расходов нет. ``arm`` подменяет методы обёртками, которые
+    снимают ``cProfile`` для следующих ``calls`` вызовов и сохраняют каждый
+    в ``<output_dir>/<запуск>/NNN-<цель>.pstats``; после последнего
+    вызова методы возвращаются на место и пишется ``summary.txt`` с
+    топом функций. С ``memory=True`` на время запуска включается
+    ``tracemalloc`` и в ``memory.snapshot`` сохраняется снимок с разницей
+    относительно начала запуска в сводке.
+
+    Одновременно профилируется один вызов: профилировщик в Python общий
+    на процесс, поэтому вызовы, пришедшие во время снятия другого,
+    выполняются без профиля и не засчитываются. Профиль корутины включает
+    всё, что event loop успел выполнить, пока она ждала.
+    """
+
+    def __init__(self, output_dir: Path, targets: Sequence[ProfileTarget], top: int = 25):
+        self.output_dir = Path(output_dir)
+        self.targets = list(targets)
+        self.top = top
+        self._lock = threading.Lock()
+        self._run: Optional[ProfileRun] = None
+        self._originals: dict[ProfileTarget, object] = {}
+        self._profiling = False
+        self._started_tracing = False
+        self._memory_start: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def run(self) -> Optional[ProfileRun]:
+        """Текущий или последний запуск."""
+        return self._run
+
+    @property
+    def armed(self) -> bool:
+        return bool(self._originals)
+
+    def arm(self, calls: int, memory: bool = False) -> ProfileRun:
+        """Профилировать следующие ``calls`` вызовов целей."""
+        if calls <= 0:
+            raise ValueError(f"Calls must be positive, got {calls}")
+        with self._lock:
+            if self._originals:
+                raise RuntimeError("Profiling is already armed")
+
+            directory = self.output_dir / datetime.now(tz=UTC).strftime("%Y%m%d-%H%M%S-%f")
+            directory.mkdir(parents=True, exist_ok=True)
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            self._run = ProfileRun(directory=directory, calls=calls, memory=memory, _loop=loop)
+
+            if memory:
+                self._started_tracing = not tracemalloc.is_tracing()
+                if self._started_tracing:
+                    tracemalloc.start(25)
+                self._memory_start = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+
+            for owner, name in self.targets:
+                original = owner.__dict__[name]
+                self._originals[(owner, name)] = original
+                setattr(owner, name, self._wrap(f"{owner.__name__}.{name}", original))
+
+        logger.info(f"Profiling armed for {calls} calls, writing to {directory}")
+        return self._run
+
+    def finish(self) -> Optional[ProfileRun]:
+        """Вернуть исходные методы и записать сводку. Повторный вызов ничего не делает."""
+        with self._lock:
+            run = self._run
+            if not self._originals:
+                return run
+            for (owner, name), original in self._originals.items():
+                setattr(owner, name, original)
+            self._originals.clear()
+
+            memory_end = None
+            if run.memory:
+                memory_end = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+                if self._started_tracing:
+                    tracemalloc.stop()
+
+        run.summary = self._summarize(run, memory_end)
+        (run.directory / "summary.txt").write_text(run.summary, encoding="utf-8")
+        logger.info(
+            f"Profiling finished: {run.captured} calls captured, {run.skipped} skipped, "
+            f"written to {run.directory}"
+        )
+        if run._loop is not None and not run._loop.is_closed():
+            run._loop.call_soon_threadsafe(run._done.set)
+        else:
+            run._done.set()
+        return run
+
+    def _summarize(self, run: ProfileRun, memory_end: Optional[tracemalloc.Snapshot]) -> str:
+        out = io.StringIO()
+        out.write(f"Captured {run.captured} of {run.calls} calls, {run.skipped} skipped while busy\n")
+        if run._files:
+            stats = pstats.Stats(*map(str, run._files), stream=out)
+            stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+        if memory_end is not None:
+            memory_end.dump(str(run.directory / "memory.snapshot"))
+            out.write(f"Top {self.top} allocation changes by line:\n")
+            for stat in memory_end.compare_to(self._memory_start, "lineno")[:self.top]:
+                out.write(f"{stat}\n")
+        return out.getvalue()
+
+    def _begin(self, label: str) -> Optional[Tuple[ProfileRun, Path, cProfile.Profile]]:
+        with self._lock:
+            run = self._run
+            if not self._originals or run.captured >= run.calls:
+                return None
+            if self._profiling:
+                run.skipped += 1
+                return None
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Профилировщик уже включён кем-то ещё
+                run.skipped += 1
+                return None
+            self._profiling = True
+            run.captured += 1
+            return run, run.directory / f"{run.captured:03d}-{label}.pstats", profile
+
+    def _end(self, capture: Tuple[ProfileRun, Path, cProfile.Profile], elapsed: float) -> None:
+        run, path, profile = capture
+        profile.disable()
+        with self._lock:
+            self._profiling = False
+            # Запуск закончился по таймауту, пока вызов выполнялся: сводка уже записана
+            if run is not self._run or not self._originals:
+                logger.info(f"Discarded profile of {path.stem}: profiling finished during the call")
+                return
+            # Файл пишется под блокировкой, чтобы finish не прочитал его недописанным
+            profile.dump_stats(path)
+            run._files.append(path)
+            complete = len(run._files) >= run.calls
+        logger.info(f"Profiled {path.stem} in {elapsed * 1000:.1f} ms")
+        if complete:
+            self.finish()
+
+    def _wrap(self, label: str, original: Callable) -> Callable:
+        if inspect.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def wrapper(*args, **kwargs):
+                capture = self._begin(label)
+                if capture is None:
+                    return await original(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    self._end(capture, time.perf_counter() - started)
+        else:
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                capture = self._begin(label)
+                if capture is None:
+                    return original(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    self._end(capture, time.perf_counter() - started)
+        return wrapper
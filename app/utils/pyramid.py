@@ -0,0 +1,84 @@
+import logging
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from app.utils.manifest import MANIFEST_NAME, PYRAMID_DIR, TileManifest
+from app.utils.tile_source import DirectoryTileSource
+
+logger = logging.getLogger(__name__)
+
+
+def max_levels(manifest: TileManifest) -> int:
+    """Число уровней, после которого вся карта помещается в один тайл."""
+    return (max(manifest.width, manifest.height) - 1).bit_length() + 1
+
+
+def build_pyramid(tiles_dir: Path, levels: Optional[int] = None, quality: int = 90) -> TileManifest:
+    """Построить уменьшенные уровни карты и записать их число в манифест.
+
+    Уровень ``z`` лежит в ``<tiles_dir>/pyramid/<z>/<x>/<y>.jpg``, где ``x``/``y``
+    отсчитываются от левого верхнего тайла исходной сетки. Каждый тайл уровня
+    собирается из четырёх тайлов предыдущего уровня и уменьшается вдвое.
+    """
+    source = DirectoryTileSource(tiles_dir)
+    manifest = source.read_manifest()
+
+    levels = min(levels or max_levels(manifest), max_levels(manifest))
+    tile_size = manifest.tile_size
+
+    previous: Dict[Tuple[int, int], Path] = {
+        (x - manifest.min_x, y - manifest.min_y): source.tile_path(x, y)
+        for x, y in manifest
+    }
+
+    for level in range(1, levels):
+        current: Dict[Tuple[int, int], Path] = {}
+        parents = {(x >> 1, y >> 1) for x, y in previous}
+
+        for parent_x, parent_y in parents:
+            canvas = Image.new("RGB", (tile_size * 2, tile_size * 2))
+            for dx in (0, 1):
+                for dy in (0, 1):
+                    child = previous.get((parent_x * 2 + dx, parent_y * 2 + dy))
+                    if child is None:
+                        continue
+                    with Image.open(child) as child_image:
+                        canvas.paste(child_image, (dx * tile_size, dy * tile_size))
+
+            tile_path = source.tile_path(parent_x, parent_y, level)
+            tile_path.parent.mkdir(parents=True, exist_ok=True)
+            canvas.reduce(2).save(tile_path, quality=quality)
+            current[(parent_x, parent_y)] = tile_path
+
+        logger.info(f"Level {level}: {len(current)} tiles")
+        previous = current
+
+    manifest = replace(manifest, levels=levels)
+    manifest.save(tiles_dir / MANIFEST_NAME)
+    return manifest
+
+
+def main() -> None:
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    parser = argparse.ArgumentParser(description="Build GTA V map tile pyramid")
+    parser.add_argument("tiles_dir", nargs="?", default="assets/map",
+                        help="Directory containing map tiles")
+    parser.add_argument("-l", "--levels", type=int, default=None,
+                        help="Number of levels including the full resolution one (default: all)")
+    parser.add_argument("-q", "--quality", type=int, default=90,
+                        help="JPEG quality of generated tiles")
+
+    args = parser.parse_args()
+
+    manifest = build_pyramid(Path(args.tiles_dir), args.levels, args.quality)
+    logger.info(f"Built {manifest.levels} levels in {Path(args.tiles_dir) / PYRAMID_DIR}")
+
+
+if __name__ == "__main__":
+    main()
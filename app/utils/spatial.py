@@ -0,0 +1,184 @@
+import math
+from array import array
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.utils.point_store import PointStore
+
+
+class PointIndex:
+    """Пространственный индекс строк ``PointStore`` по мировым координатам x/y.
+
+    Равномерная сетка с ячейками ``cell_size`` × ``cell_size``: в ячейке
+    хранятся только номера строк, координаты и уровни берутся из колонок
+    хранилища. Строки добавляются по одной или пачками без перестроения, запросы по
+    прямоугольнику и поиск ближайших просматривают только соседние ячейки.
+    """
+
+    def __init__(self, store: "PointStore", cell_size: float = 250.0):
+        if cell_size <= 0:
+            raise ValueError(f"Cell size must be positive, got {cell_size}")
+        self.store = store
+        self.cell_size = cell_size
+        self._cells: dict[Tuple[int, int], array] = {}
+        self._count = 0
+        self._min_cell: Optional[Tuple[int, int]] = None
+        self._max_cell: Optional[Tuple[int, int]] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def add(self, row: int, x: float, y: float) -> None:
+        cell = self._cell(x, y)
+        rows = self._cells.get(cell)
+        if rows is None:
+            rows = self._cells[cell] = array("q")
+        rows.append(row)
+        self._count += 1
+
+        if self._min_cell is None:
+            self._min_cell = self._max_cell = cell
+        else:
+            self._min_cell = (min(self._min_cell[0], cell[0]), min(self._min_cell[1], cell[1]))
+            self._max_cell = (max(self._max_cell[0], cell[0]), max(self._max_cell[1], cell[1]))
+
+    def add_many(self, rows: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> None:
+        if not len(rows):
+            return
+
+        cell_xs = np.floor(np.asarray(xs) / self.cell_size).astype(np.int64)
+        cell_ys = np.floor(np.asarray(ys) / self.cell_size).astype(np.int64)
+        order = np.lexsort((cell_ys, cell_xs))
+        rows = np.asarray(rows, dtype=np.int64)[order]
+        cell_xs, cell_ys = cell_xs[order], cell_ys[order]
+
+        # Границы групп строк с одинаковой ячейкой после сортировки
+        changes = np.flatnonzero((np.diff(cell_xs) != 0) | (np.diff(cell_ys) != 0)) + 1
+        starts = np.concatenate(([0], changes))
+        ends = np.concatenate((changes, [len(rows)]))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            cell = (int(cell_xs[start]), int(cell_ys[start]))
+            cell_rows = self._cells.get(cell)
+            if cell_rows is None:
+                cell_rows = self._cells[cell] = array("q")
+            cell_rows.frombytes(rows[start:end].tobytes())
+        self._count += len(rows)
+
+        low = (int(cell_xs.min()), int(cell_ys.min()))
+        high = (int(cell_xs.max()), int(cell_ys.max()))
+        if self._min_cell is not None:
+            low = (min(low[0], self._min_cell[0]), min(low[1], self._min_cell[1]))
+            high = (max(high[0], self._max_cell[0]), max(high[1], self._max_cell[1]))
+        self._min_cell, self._max_cell = low, high
+
+    def remove(self, row: int, x: float, y: float) -> None:
+        rows = self._cells.get(self._cell(x, y))
+        if rows is not None and row in rows:
+            rows.remove(row)
+            self._count -= 1
+
+    def _gather(self, cells: Iterable[Tuple[int, int]]) -> np.ndarray:
+        # tobytes() копирует ячейку целиком, поэтому параллельная запись не мешает чтению
+        chunks = [self._cells[cell].tobytes() for cell in cells if cell in self._cells]
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.frombuffer(b"".join(chunks), dtype=np.int64)
+
+    def _filter_level(self, rows: np.ndarray, level: Optional[int]) -> np.ndarray:
+        if level is None or len(rows) == 0:
+            return rows
+        return rows[self.store.level[rows] == level]
+
+    def query_rect(self, min_x: float, min_y: float, max_x: float, max_y: float,
+                   level: Optional[int] = None) -> np.ndarray:
+        """Номера строк точек внутри прямоугольника (границы включительно)."""
+        if self._min_cell is None:
+            return np.empty(0, dtype=np.int64)
+
+        low_x, low_y = self._cell(min_x, min_y)
+        high_x, high_y = self._cell(max_x, max_y)
+        low_x, low_y = max(low_x, self._min_cell[0]), max(low_y, self._min_cell[1])
+        high_x, high_y = min(high_x, self._max_cell[0]), min(high_y, self._max_cell[1])
+
+        rows = self._gather(
+            (cell_x, cell_y)
+            for cell_x in range(low_x, high_x + 1)
+            for cell_y in range(low_y, high_y + 1)
+        )
+        rows = self._filter_level(rows, level)
+        xs, ys = self.store.x[rows], self.store.y[rows]
+        return rows[(xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y)]
+
+    def nearest(self, x: float, y: float, k: int = 1, level: Optional[int] = None,
+                max_distance: Optional[float] = None) -> list[Tuple[float, int]]:
+        """``k`` ближайших точек в виде пар ``(расстояние, строка)`` по возрастанию расстояния."""
+        if self._min_cell is None or k <= 0:
+            return []
+
+        center_x, center_y = self._cell(x, y)
+        (low_x, low_y), (high_x, high_y) = self._min_cell, self._max_cell
+        # Кольца ближе first_ring целиком вне занятых ячеек, после max_ring сетка исчерпана
+        first_ring = max(0, low_x - center_x, center_x - high_x, low_y - center_y, center_y - high_y)
+        max_ring = max(
+            abs(center_x - low_x), abs(center_x - high_x),
+            abs(center_y - low_y), abs(center_y - high_y),
+        )
+
+        found_rows = []
+        found_distances = []
+        count = 0
+        for ring in range(first_ring, max_ring + 1):
+            cells = self._ring_cells(center_x, center_y, ring, self._min_cell, self._max_cell)
+            rows = self._filter_level(self._gather(cells), level)
+            if len(rows):
+                found_rows.append(rows)
+                found_distances.append(np.hypot(self.store.x[rows] - x, self.store.y[rows] - y))
+                count += len(rows)
+
+            # Всё, что дальше ring * cell_size от точки запроса, лежит во внешних кольцах
+            reach = ring * self.cell_size
+            if max_distance is not None and reach > max_distance:
+                break
+            if count >= k:
+                distances = np.concatenate(found_distances)
+                if np.partition(distances, k - 1)[k - 1] <= reach:
+                    break
+
+        if not count:
+            return []
+
+        rows = np.concatenate(found_rows)
+        distances = np.concatenate(found_distances)
+        order = np.argsort(distances, kind="stable")[:k]
+        return [
+            (float(distances[i]), int(rows[i])) for i in order
+            if max_distance is None or distances[i] <= max_distance
+        ]
+
+    @staticmethod
+    def _ring_cells(center_x: int, center_y: int, ring: int, low: Tuple[int, int],
+                    high: Tuple[int, int]) -> Iterable[Tuple[int, int]]:
+        # Стороны кольца обрезаются по занятым ячейкам [low, high], поэтому
+        # число ячеек ограничено размером сетки, а не удалённостью точки запроса
+        (low_x, low_y), (high_x, high_y) = low, high
+        if ring == 0:
+            if low_x <= center_x <= high_x and low_y <= center_y <= high_y:
+                yield center_x, center_y
+            return
+
+        start_x, end_x = max(center_x - ring, low_x), min(center_x + ring, high_x)
+        for cell_y in (center_y - ring, center_y + ring):
+            if low_y <= cell_y <= high_y:
+                for cell_x in range(start_x, end_x + 1):
+                    yield cell_x, cell_y
+
+        start_y, end_y = max(center_y - ring + 1, low_y), min(center_y + ring - 1, high_y)
+        for cell_x in (center_x - ring, center_x + ring):
+            if low_x <= cell_x <= high_x:
+                for cell_y in range(start_y, end_y + 1):
+                    yield cell_x, cell_y
@@ -0,0 +1,172 @@
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from app.utils.manifest import MANIFEST_NAME, PYRAMID_DIR, TileManifest
+
+logger = logging.getLogger(__name__)
+
+
+class TileSource(ABC):
+    """Абстрактный источник тайлов карты.
+
+    Тайлы исходного уровня адресуются координатами сетки из манифеста,
+    тайлы уровней пирамиды — координатами от левого верхнего тайла.
+    """
+
+    @abstractmethod
+    def read_manifest(self) -> TileManifest:
+        """Прочитать манифест набора тайлов."""
+        pass
+
+    @abstractmethod
+    def read(self, x: int, y: int, level: int = 0) -> Optional[bytes]:
+        """Прочитать закодированный тайл. None, если тайла нет."""
+        pass
+
+    def iter_tiles(self, manifest: TileManifest) -> Iterator[Tuple[int, int, int]]:
+        """Перечислить координаты ``(level, x, y)`` всех тайлов набора."""
+        for x, y in manifest:
+            yield 0, x, y
+        for level in range(1, manifest.levels):
+            for x, y in sorted(manifest.level_tiles(level)):
+                yield level, x, y
+
+
+class DirectoryTileSource(TileSource):
+    """Тайлы в дереве ``<x>/<y>.jpg`` и ``pyramid/<level>/<x>/<y>.jpg``."""
+
+    def __init__(self, root: Path, tile_size: int = 256):
+        self.root = Path(root)
+        self.tile_size = tile_size
+
+    def tile_path(self, x: int, y: int, level: int = 0) -> Path:
+        if level == 0:
+            return self.root / str(x) / f"{y}.jpg"
+        return self.root / PYRAMID_DIR / str(level) / str(x) / f"{y}.jpg"
+
+    def read_manifest(self) -> TileManifest:
+        manifest_path = self.root / MANIFEST_NAME
+        try:
+            return TileManifest.load(manifest_path)
+        except FileNotFoundError:
+            logger.warning(f"Tile manifest {manifest_path} not found, scanning {self.root}")
+            return TileManifest.scan(self.root, self.tile_size)
+
+    def read(self, x: int, y: int, level: int = 0) -> Optional[bytes]:
+        try:
+            return self.tile_path(x, y, level).read_bytes()
+        except FileNotFoundError:
+            return None
+
+
+class ArchiveTileSource(TileSource):
+    """Все тайлы в одном файле SQLite по образцу MBTiles.
+
+    Таблица ``tiles(zoom_level, tile_column, tile_row, tile_data)``, где
+    ``zoom_level`` — уровень пирамиды (0 — исходный), манифест хранится
+    в таблице ``metadata`` под именем ``manifest``.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS tiles (
+            zoom_level INTEGER NOT NULL,
+            tile_column INTEGER NOT NULL,
+            tile_row INTEGER NOT NULL,
+            tile_data BLOB NOT NULL,
+            PRIMARY KEY (zoom_level, tile_column, tile_row)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Tile archive {self.path} not found")
+        self._local = threading.local()
+
+    def __getstate__(self) -> dict:
+        # Соединения SQLite не передаются между процессами
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"])
+
+    def _connection(self) -> sqlite3.Connection:
+        # Отдельное соединение на поток, файл открывается только на чтение
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.connection = connection
+        return connection
+
+    def read_manifest(self) -> TileManifest:
+        row = self._connection().execute(
+            "SELECT value FROM metadata WHERE name = 'manifest'"
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Tile archive {self.path} has no manifest")
+        return TileManifest.from_json(row[0])
+
+    def read(self, x: int, y: int, level: int = 0) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (level, x, y),
+        ).fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def convert(cls, source: TileSource, path: Path) -> "ArchiveTileSource":
+        """Упаковать все тайлы и манифест источника в файл архива."""
+        manifest = source.read_manifest()
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.unlink(missing_ok=True)
+
+        connection = sqlite3.connect(tmp_path)
+        try:
+            connection.executescript(cls.SCHEMA)
+            connection.executemany(
+                "INSERT INTO metadata (name, value) VALUES (?, ?)",
+                [("name", "waypoint"), ("format", "jpg"), ("manifest", manifest.to_json())],
+            )
+            count = 0
+            for level, x, y in source.iter_tiles(manifest):
+                data = source.read(x, y, level)
+                if data is None:
+                    continue
+                connection.execute(
+                    "INSERT INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+                    (level, x, y, data),
+                )
+                count += 1
+            connection.commit()
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+
+        tmp_path.replace(path)
+        logger.info(f"Packed {count} tiles ({manifest.levels} levels) into {path}")
+        return cls(path)
+
+
+def main() -> None:
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    parser = argparse.ArgumentParser(description="Pack GTA V map tiles into a single-file archive")
+    parser.add_argument("tiles_dir", nargs="?", default="assets/map",
+                        help="Directory containing map tiles")
+    parser.add_argument("-o", "--output", default="assets/map.mbtiles",
+                        help="Output archive file")
+
+    args = parser.parse_args()
+
+    ArchiveTileSource.convert(DirectoryTileSource(Path(args.tiles_dir)), Path(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,35 @@
+import numpy as np
 from PIL import Image, ImageDraw
 from pathlib import Path
+import io
 import logging
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Tuple, Optional, List
-from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, Tuple, Optional, List, Sequence
+
+from app.utils.manifest import TileManifest
+from app.utils.metrics import FRAGMENT_BYTES, RENDER_SECONDS, span
+from app.utils.overlay import draw_route
+from app.utils.tile_source import DirectoryTileSource, TileSource
+
+if TYPE_CHECKING:
+    from app.utils.atlas import RasterAtlas
+    from app.utils.point_store import PointStore
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
 
+def encode_jpeg(image: Image.Image, quality: int = 100) -> bytes:
+    # Кодирование в память вместо временного файла на диске
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
 @dataclass(frozen=True)
 class Point:
     x: float
@@ -17,79 +38,218 @@ class Point:
 
 @dataclass
 class TileInfo:
-    path: Path
     x: int
     y: int
     bounds: Tuple[int, int, int, int]
+    level: int = 0
 
 
-class TileCache:
-    def __init__(self, max_size: int = 50):
-        self.max_size = max_size
-        self._cache: Dict[Tuple[int, int], Image.Image] = {}
+@dataclass(frozen=True)
+class FragmentPlan:
+    center: Point
+    region: Tuple[int, int, int, int]
+    level: int
+    reduction: int
+    size: Tuple[int, int]
+
+    def project(self, pixels: np.ndarray) -> np.ndarray:
+        """Перевести пиксели исходного уровня (N×2) в пиксели фрагмента."""
+        left, top, right, bottom = self.region
+        ratio = np.array([self.size[0] / (right - left), self.size[1] / (bottom - top)])
+        return (pixels / 2 ** self.level - (left, top)) * ratio
+
 
-    @lru_cache(maxsize=128)
-    def _get_tile_key(self, x: int, y: int) -> Tuple[int, int]:
-        return (x, y)
+TileLoader = Callable[[TileInfo, int], Optional[Image.Image]]
 
-    def get(self, x: int, y: int) -> Optional[Image.Image]:
-        key = self._get_tile_key(x, y)
-        return self._cache.get(key)
 
-    def set(self, x: int, y: int, image: Image.Image) -> None:
-        if len(self._cache) >= self.max_size:
-            self._cache.pop(next(iter(self._cache)))
-        self._cache[(x, y)] = image.copy()
+@dataclass(frozen=True)
+class TileCacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    resident_bytes: int
+    max_bytes: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TileCache:
+    """Потокобезопасный LRU-кэш декодированных тайлов с ограничением по памяти."""
+
+    def __init__(self, max_memory_mb: float = 64):
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self._cache: OrderedDict[Tuple[int, int, int, int], Image.Image] = OrderedDict()
+        self._lock = threading.Lock()
+        self._resident_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _image_bytes(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, x: int, y: int, level: int = 0, reduction: int = 1) -> Optional[Image.Image]:
+        key = (level, x, y, reduction)
+        with self._lock:
+            image = self._cache.get(key)
+            if image is None:
+                self._misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self._hits += 1
+            return image
+
+    def set(self, x: int, y: int, image: Image.Image, level: int = 0, reduction: int = 1) -> None:
+        key = (level, x, y, reduction)
+        size = self._image_bytes(image)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._resident_bytes -= self._image_bytes(previous)
+
+            while self._cache and self._resident_bytes + size > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._resident_bytes -= self._image_bytes(evicted)
+                self._evictions += 1
+
+            self._cache[key] = image
+            self._resident_bytes += size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._resident_bytes = 0
+
+    def __getstate__(self) -> dict:
+        # В дочерний процесс передаётся только конфигурация, без тайлов и блокировки
+        return {"max_bytes": self.max_bytes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["max_bytes"] / (1024 * 1024))
+
+    def stats(self) -> TileCacheStats:
+        with self._lock:
+            return TileCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._cache),
+                resident_bytes=self._resident_bytes,
+                max_bytes=self.max_bytes,
+            )
+
+
+class BatchTileLoader:
+    """Загрузчик тайлов пакетной отрисовки: каждый тайл декодируется один раз.
+
+    Тайл удерживается независимо от вытеснения из TileCache, пока его ждут
+    оставшиеся планы ``plans``, и отпускается после последнего из них;
+    одновременные запросы одного тайла из разных потоков ждут одно
+    декодирование. Без ``plans`` тайлы удерживаются до конца пакета.
+    """
+
+    def __init__(self, viewer: "GTAVTileViewer", plans: Iterable[FragmentPlan] = ()):
+        self.viewer = viewer
+        self._lock = threading.Lock()
+        self._tiles: Dict[Tuple[int, int, int, int], Future] = {}
+        # Сколько ещё планов пакета прочитают каждый тайл
+        self._pending: Dict[Tuple[int, int, int, int], int] = {}
+        self._decoded = 0
+        for plan in plans:
+            if plan.level in viewer.atlases:
+                continue
+            for tile in viewer._get_tiles_in_region(*plan.region, plan.level):
+                key = (tile.level, tile.x, tile.y, plan.reduction)
+                self._pending[key] = self._pending.get(key, 0) + 1
+
+    @property
+    def decoded(self) -> int:
+        return self._decoded
+
+    @property
+    def pinned(self) -> int:
+        return len(self._tiles)
+
+    def __call__(self, tile: TileInfo, reduction: int) -> Optional[Image.Image]:
+        key = (tile.level, tile.x, tile.y, reduction)
+        with self._lock:
+            future = self._tiles.get(key)
+            owner = future is None
+            if owner:
+                future = self._tiles[key] = Future()
+                self._decoded += 1
+
+        if owner:
+            future.set_result(self.viewer._load_tile_image(tile, reduction))
+        image = future.result()
+
+        with self._lock:
+            remaining = self._pending.get(key)
+            if remaining == 1:
+                del self._pending[key]
+                self._tiles.pop(key, None)
+            elif remaining is not None:
+                self._pending[key] = remaining - 1
+        return image
 
 
 class GTAVTileViewer:
     TILE_SIZE = 256
+    # Коэффициенты уменьшения, которые libjpeg умеет выполнять при декодировании
+    DRAFT_REDUCTIONS = (8, 4, 2)
     SCALE_X = 1.82
     SCALE_Y = -1.82
     CENTER_X = 7535.12
     CENTER_Y = 15291.00
 
-    def __init__(self, tiles_dir: str = "assets"):
+    def __init__(self, tiles_dir: str = "assets", manifest: Optional[TileManifest] = None,
+                 cache_mb: float = 64, atlases: Optional[Dict[int, "RasterAtlas"]] = None,
+                 source: Optional[TileSource] = None, points: Optional["PointStore"] = None):
         self.tiles_dir = Path(tiles_dir)
+        self.source = source or DirectoryTileSource(self.tiles_dir, self.TILE_SIZE)
         self.tiles: Dict[Tuple[int, int], TileInfo] = {}
-        self.tile_cache = TileCache()
+        self.level_tiles: List[set[Tuple[int, int]]] = []
+        self.tile_cache = TileCache(cache_mb)
+        # Уровни, для которых есть растр в памяти, режутся из него без декодирования тайлов
+        self.atlases = atlases or {}
+        # Точки хранилища наносятся на фрагменты, запрошенные с show_points
+        self.points = points
+        self.manifest = manifest or self.source.read_manifest()
 
         self._load_tiles()
         self._calculate_bounds()
 
     def _load_tiles(self) -> None:
-        for x_dir in self.tiles_dir.iterdir():
-            if not x_dir.is_dir():
-                continue
-
-            try:
-                x = int(x_dir.name)
-            except ValueError:
-                continue
+        if self.manifest.tile_size != self.TILE_SIZE:
+            raise ValueError(f"Manifest tile size {self.manifest.tile_size} != {self.TILE_SIZE}")
 
-            for tile_path in x_dir.glob("*.jpg"):
-                try:
-                    y = int(tile_path.stem)
-                    self.tiles[(x, y)] = TileInfo(
-                        path=tile_path,
-                        x=x,
-                        y=y,
-                        bounds=(0, 0, self.TILE_SIZE, self.TILE_SIZE)
-                    )
-                except ValueError:
-                    continue
+        for x, y in self.manifest:
+            self.tiles[(x, y)] = TileInfo(
+                x=x,
+                y=y,
+                bounds=(0, 0, self.TILE_SIZE, self.TILE_SIZE)
+            )
 
         if not self.tiles:
             raise ValueError("No tiles found in directory")
 
-    def _calculate_bounds(self) -> None:
-        xs = [tile.x for tile in self.tiles.values()]
-        ys = [tile.y for tile in self.tiles.values()]
+        # Наличие тайлов уменьшенных уровней выводится из исходной сетки
+        self.levels = self.manifest.levels
+        self.level_tiles = [set()] + [self.manifest.level_tiles(level) for level in range(1, self.levels)]
 
-        self.min_x = min(xs)
-        self.max_x = max(xs)
-        self.min_y = min(ys)
-        self.max_y = max(ys)
+    def _calculate_bounds(self) -> None:
+        self.min_x = self.manifest.min_x
+        self.max_x = self.manifest.max_x
+        self.min_y = self.manifest.min_y
+        self.max_y = self.manifest.max_y
 
         self.width_tiles = self.max_x - self.min_x + 1
         self.height_tiles = self.max_y - self.min_y + 1
@@ -97,7 +257,8 @@ class GTAVTileViewer:
         self.map_width = self.width_tiles * self.TILE_SIZE
         self.map_height = self.height_tiles * self.TILE_SIZE
 
-        logger.info(f"Loaded {len(self.tiles)} tiles, grid: {self.width_tiles}x{self.height_tiles}")
+        logger.info(f"Loaded {len(self.tiles)} tiles, grid: {self.width_tiles}x{self.height_tiles}, "
+                    f"levels: {self.levels}")
 
     def world_to_pixel(self, point: Point) -> Point:
         x = int(self.CENTER_X + point.x * self.SCALE_X)
@@ -107,87 +268,312 @@ class GTAVTileViewer:
             max(0, min(y, self.map_height - 1))
         )
 
-    def _get_tile_at_pixel(self, pixel_x: int, pixel_y: int) -> Optional[TileInfo]:
-        tile_x = self.min_x + pixel_x // self.TILE_SIZE
-        tile_y = self.min_y + pixel_y // self.TILE_SIZE
-        return self.tiles.get((tile_x, tile_y))
+    def world_to_pixel_many(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        # Векторный вариант world_to_pixel: массив N×2 пикселей исходного уровня
+        pixels = np.empty((len(xs), 2), dtype=np.int64)
+        pixels[:, 0] = self.CENTER_X + np.asarray(xs, dtype=np.float64) * self.SCALE_X
+        pixels[:, 1] = self.CENTER_Y + np.asarray(ys, dtype=np.float64) * self.SCALE_Y
+        np.clip(pixels[:, 0], 0, self.map_width - 1, out=pixels[:, 0])
+        np.clip(pixels[:, 1], 0, self.map_height - 1, out=pixels[:, 1])
+        return pixels
+
+    def pixel_to_world_many(self, pixel_xs: np.ndarray, pixel_ys: np.ndarray) -> np.ndarray:
+        world = np.empty((len(pixel_xs), 2), dtype=np.float64)
+        world[:, 0] = (np.asarray(pixel_xs, dtype=np.float64) - self.CENTER_X) / self.SCALE_X
+        world[:, 1] = (np.asarray(pixel_ys, dtype=np.float64) - self.CENTER_Y) / self.SCALE_Y
+        return world
+
+    def _zoom_level(self, zoom: int) -> int:
+        return max(0, min(zoom, self.levels - 1))
+
+    def center_pixel(self, world_point: Point, zoom: int = 0) -> Point:
+        # Центр фрагмента в пикселях уровня пирамиды, из которого он собирается
+        pixel = self.world_to_pixel(world_point)
+        level = self._zoom_level(zoom)
+        return Point(pixel.x >> level, pixel.y >> level)
+
+    def _level_size(self, level: int) -> Tuple[int, int]:
+        return -(-self.map_width >> level), -(-self.map_height >> level)
+
+    def _level_origin(self, level: int) -> Tuple[int, int]:
+        # Тайлы исходного уровня адресуются абсолютно, уровни пирамиды — от нуля
+        return (self.min_x, self.min_y) if level == 0 else (0, 0)
+
+    def _get_tile(self, x: int, y: int, level: int = 0) -> Optional[TileInfo]:
+        if level == 0:
+            return self.tiles.get((x, y))
+        if (x, y) not in self.level_tiles[level]:
+            return None
+        return TileInfo(
+            x=x,
+            y=y,
+            bounds=(0, 0, self.TILE_SIZE, self.TILE_SIZE),
+            level=level,
+        )
+
+    def _get_tile_at_pixel(self, pixel_x: int, pixel_y: int, level: int = 0) -> Optional[TileInfo]:
+        origin_x, origin_y = self._level_origin(level)
+        tile_x = origin_x + pixel_x // self.TILE_SIZE
+        tile_y = origin_y + pixel_y // self.TILE_SIZE
+        return self._get_tile(tile_x, tile_y, level)
 
-    def _load_tile_image(self, tile: TileInfo) -> Optional[Image.Image]:
-        cached = self.tile_cache.get(tile.x, tile.y)
-        if cached:
+    def _load_tile_image(self, tile: TileInfo, reduction: int = 1) -> Optional[Image.Image]:
+        cached = self.tile_cache.get(tile.x, tile.y, tile.level, reduction)
+        if cached is not None:
             return cached
 
         try:
-            image = Image.open(tile.path)
-            self.tile_cache.set(tile.x, tile.y, image)
+            data = self.source.read(tile.x, tile.y, tile.level)
+            if data is None:
+                return None
+            reduced_size = self.TILE_SIZE // reduction
+            with span(RENDER_SECONDS, stage="tile_decode"):
+                with Image.open(io.BytesIO(data)) as encoded:
+                    if reduction > 1:
+                        # Масштабирование в DCT-области: JPEG сразу декодируется в 1/2, 1/4 или 1/8
+                        encoded.draft("RGB", (reduced_size, reduced_size))
+                    image = encoded.convert("RGB")
+                if image.width != reduced_size:
+                    image = image.reduce(image.width // reduced_size)
+            self.tile_cache.set(tile.x, tile.y, image, tile.level, reduction)
             return image
         except Exception as e:
-            logger.warning(f"Failed to load tile {tile.x},{tile.y}: {e}")
+            logger.warning(f"Failed to load tile {tile.level}/{tile.x},{tile.y}: {e}")
             return None
 
-    def _get_tiles_in_region(self, left: int, top: int, right: int, bottom: int) -> List[TileInfo]:
+    def _get_tiles_in_region(self, left: int, top: int, right: int, bottom: int,
+                             level: int = 0) -> List[TileInfo]:
         tiles = []
+        origin_x, origin_y = self._level_origin(level)
 
-        start_x = self.min_x + left // self.TILE_SIZE
-        end_x = self.min_x + (right - 1) // self.TILE_SIZE
-        start_y = self.min_y + top // self.TILE_SIZE
-        end_y = self.min_y + (bottom - 1) // self.TILE_SIZE
+        start_x = origin_x + left // self.TILE_SIZE
+        end_x = origin_x + (right - 1) // self.TILE_SIZE
+        start_y = origin_y + top // self.TILE_SIZE
+        end_y = origin_y + (bottom - 1) // self.TILE_SIZE
 
         for x in range(start_x, end_x + 1):
             for y in range(start_y, end_y + 1):
-                tile = self.tiles.get((x, y))
+                tile = self._get_tile(x, y, level)
                 if tile:
                     tiles.append(tile)
 
         return tiles
 
-    def get_fragment(self, world_point: Point, size_x: int = 700, size_y: int = 700, show_dot: bool = True,
-                     dot_color: str = "green") -> Image.Image:
-        center_pixel = self.world_to_pixel(world_point)
+    def _draft_reduction(self, downscale: float) -> int:
+        for reduction in self.DRAFT_REDUCTIONS:
+            if downscale >= reduction:
+                return reduction
+        return 1
 
-        left = max(0, center_pixel.x - size_x // 2)
-        top = max(0, center_pixel.y - size_y // 2)
-        right = min(self.map_width, left + size_x)
-        bottom = min(self.map_height, top + size_y)
+    def _compose(self, left: int, top: int, right: int, bottom: int, level: int = 0,
+                 reduction: int = 1, loader: Optional[TileLoader] = None) -> Image.Image:
+        atlas = self.atlases.get(level)
+        if atlas is not None:
+            return atlas.read_window(left, top, right, bottom)
 
-        fragment = Image.new('RGB', (right - left, bottom - top))
+        # При reduction > 1 склейка идёт сразу в уменьшенном разрешении
+        tile_size = self.TILE_SIZE // reduction
+        reduced_left, reduced_top = left // reduction, top // reduction
+        reduced_right, reduced_bottom = -(-right // reduction), -(-bottom // reduction)
 
-        tiles = self._get_tiles_in_region(left, top, right, bottom)
+        fragment = Image.new('RGB', (reduced_right - reduced_left, reduced_bottom - reduced_top))
+        origin_x, origin_y = self._level_origin(level)
 
-        for tile in tiles:
-            tile_image = self._load_tile_image(tile)
+        for tile in self._get_tiles_in_region(left, top, right, bottom, level):
+            tile_image = (loader or self._load_tile_image)(tile, reduction)
             if not tile_image:
                 continue
 
-            tile_left = (tile.x - self.min_x) * self.TILE_SIZE
-            tile_top = (tile.y - self.min_y) * self.TILE_SIZE
+            tile_left = (tile.x - origin_x) * tile_size
+            tile_top = (tile.y - origin_y) * tile_size
 
-            crop_left = max(left - tile_left, 0)
-            crop_top = max(top - tile_top, 0)
-            crop_right = min(self.TILE_SIZE, right - tile_left)
-            crop_bottom = min(self.TILE_SIZE, bottom - tile_top)
+            crop_left = max(reduced_left - tile_left, 0)
+            crop_top = max(reduced_top - tile_top, 0)
+            crop_right = min(tile_size, reduced_right - tile_left)
+            crop_bottom = min(tile_size, reduced_bottom - tile_top)
 
             if crop_right <= crop_left or crop_bottom <= crop_top:
                 continue
 
             cropped = tile_image.crop((crop_left, crop_top, crop_right, crop_bottom))
 
-            paste_x = tile_left + crop_left - left
-            paste_y = tile_top + crop_top - top
+            paste_x = tile_left + crop_left - reduced_left
+            paste_y = tile_top + crop_top - reduced_top
 
             fragment.paste(cropped, (int(paste_x), int(paste_y)))
 
+        return fragment
+
+    def _plan_fragment(self, pixel: Point, size_x: int, size_y: int, zoom: int = 0,
+                       scale: float = 1.0) -> FragmentPlan:
+        # zoom — уменьшение в 2**zoom раз; если такого уровня пирамиды нет,
+        # берётся ближайший построенный и результат досжимается.
+        # scale (0, 1] — дополнительное уменьшение относительно уровня zoom
+        if not 0 < scale <= 1:
+            raise ValueError(f"Scale must be in (0, 1], got {scale}")
+
+        level = self._zoom_level(zoom)
+        downscale = 2 ** (max(zoom, 0) - level) / scale
+        window_x, window_y = int(size_x * downscale), int(size_y * downscale)
+
+        center_pixel = Point(int(pixel.x) >> level, int(pixel.y) >> level)
+        level_width, level_height = self._level_size(level)
+
+        left = max(0, center_pixel.x - window_x // 2)
+        top = max(0, center_pixel.y - window_y // 2)
+        right = min(level_width, left + window_x)
+        bottom = min(level_height, top + window_y)
+
+        return FragmentPlan(
+            center=center_pixel,
+            region=(left, top, right, bottom),
+            level=level,
+            reduction=self._draft_reduction(downscale),
+            size=(size_x, size_y),
+        )
+
+    def _render_plan(self, plan: FragmentPlan, show_dot: bool, dot_color: str,
+                     loader: Optional[TileLoader] = None, show_points: bool = False) -> Image.Image:
+        left, top, right, bottom = plan.region
+        size_x, size_y = plan.size
+        center_pixel = plan.center
+
+        # Метрики пишутся в процессе, где идёт отрисовка: из процессов пула
+        # AsyncTileViewer они на эндпоинт не попадают
+        with span(RENDER_SECONDS, stage="compose"):
+            fragment = self._compose(left, top, right, bottom, plan.level, plan.reduction, loader)
+
         if fragment.size != (size_x, size_y):
-            fragment = fragment.resize((size_x, size_y), Image.Resampling.LANCZOS)
-            dot_position = Point(size_x // 2, size_y // 2)
+            ratio_x = size_x / (right - left)
+            ratio_y = size_y / (bottom - top)
+            with span(RENDER_SECONDS, stage="resize"):
+                fragment = fragment.resize((size_x, size_y), Image.Resampling.LANCZOS)
+            dot_position = Point(int((center_pixel.x - left) * ratio_x), int((center_pixel.y - top) * ratio_y))
         else:
             dot_position = Point(center_pixel.x - left, center_pixel.y - top)
 
+        if show_points:
+            with span(RENDER_SECONDS, stage="points"):
+                self._draw_points(fragment, plan)
         if show_dot:
             self._draw_dot(fragment, dot_position, dot_color)
 
         return fragment
 
+    def _draw_points(self, fragment: Image.Image, plan: FragmentPlan) -> None:
+        if self.points is None:
+            return
+
+        left, top, right, bottom = plan.region
+        factor = 2 ** plan.level
+        (x1, y1), (x2, y2) = self.pixel_to_world_many([left * factor, right * factor],
+                                                      [top * factor, bottom * factor])
+        rows = self.points.index.query_rect(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        if not len(rows):
+            return
+
+        pixels = self.world_to_pixel_many(self.points.x[rows], self.points.y[rows])
+        draw_route(fragment, plan.project(pixels), self.points.numbers[rows].tolist(), connect=False)
+
+    def get_fragment(self, world_point: Point, size_x: int = 700, size_y: int = 700, show_dot: bool = True,
+                     dot_color: str = "green", zoom: int = 0, scale: float = 1.0,
+                     show_points: bool = False) -> Image.Image:
+        plan = self._plan_fragment(self.world_to_pixel(world_point), size_x, size_y, zoom, scale)
+        return self._render_plan(plan, show_dot, dot_color, show_points=show_points)
+
+    def get_fragment_bytes(self, world_point: Point, size_x: int = 700, size_y: int = 700,
+                           show_dot: bool = True, dot_color: str = "green", zoom: int = 0,
+                           scale: float = 1.0, quality: int = 100, show_points: bool = False) -> bytes:
+        fragment = self.get_fragment(world_point, size_x, size_y, show_dot, dot_color, zoom, scale,
+                                     show_points)
+        with span(RENDER_SECONDS, stage="encode"):
+            data = encode_jpeg(fragment, quality)
+        FRAGMENT_BYTES.observe(len(data))
+        return data
+
+    def plan_many(self, points: Iterable[Point], size_x: int = 700, size_y: int = 700, zoom: int = 0,
+                  scale: float = 1.0) -> list[Tuple[int, FragmentPlan]]:
+        """Спланировать фрагменты для набора точек.
+
+        Возвращает пары ``(индекс точки, план)`` в порядке отрисовки:
+        фрагменты с общими тайлами идут подряд, чтобы первые результаты были готовы раньше.
+        """
+        points = list(points)
+        pixels = self.world_to_pixel_many([p.x for p in points], [p.y for p in points])
+        plans = [self._plan_fragment(Point(x, y), size_x, size_y, zoom, scale) for x, y in pixels.tolist()]
+        order = sorted(range(len(plans)), key=lambda i: (plans[i].level, plans[i].region[1], plans[i].region[0]))
+        return [(index, plans[index]) for index in order]
+
+    def render_plan_bytes(self, plan: FragmentPlan, show_dot: bool = True, dot_color: str = "green",
+                          loader: Optional[TileLoader] = None, quality: int = 100) -> bytes:
+        """Отрисовать фрагмент по плану из ``plan_many`` и вернуть его в виде JPEG."""
+        return encode_jpeg(self._render_plan(plan, show_dot, dot_color, loader), quality)
+
+    def render_many(self, points: Iterable[Point], size_x: int = 700, size_y: int = 700,
+                    show_dot: bool = True, dot_color: str = "green", zoom: int = 0, scale: float = 1.0,
+                    max_workers: int = 1) -> Iterator[Tuple[int, Image.Image]]:
+        """Отрисовать фрагменты для набора точек, декодируя каждый тайл один раз.
+
+        Возвращает пары ``(индекс точки, фрагмент)`` по мере готовности; при
+        ``max_workers > 1`` порядок соответствует завершению, а не входу.
+        """
+        plans = self.plan_many(points, size_x, size_y, zoom, scale)
+        loader = BatchTileLoader(self, (plan for _, plan in plans))
+
+        if max_workers <= 1:
+            for index, plan in plans:
+                yield index, self._render_plan(plan, show_dot, dot_color, loader)
+            return
+
+        # В пул отправляется не больше max_workers планов за раз, чтобы после
+        # остановки потребителя не отрисовывать остаток пакета
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tile-batch")
+        queued = iter(plans)
+        pending: Dict[Future, int] = {}
+        try:
+            while True:
+                for index, plan in islice(queued, max_workers - len(pending)):
+                    pending[executor.submit(self._render_plan, plan, show_dot, dot_color, loader)] = index
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def render_many_bytes(self, points: Iterable[Point], size_x: int = 700, size_y: int = 700,
+                          show_dot: bool = True, dot_color: str = "green", zoom: int = 0, scale: float = 1.0,
+                          max_workers: int = 1, quality: int = 100) -> Iterator[Tuple[int, bytes]]:
+        for index, fragment in self.render_many(points, size_x, size_y, show_dot, dot_color, zoom, scale,
+                                                max_workers):
+            yield index, encode_jpeg(fragment, quality)
+
+    def get_route_fragment(self, points: Sequence, size_x: int = 700, size_y: int = 700,
+                           zoom: Optional[int] = None, labels: bool = True, padding: float = 0.1) -> Image.Image:
+        """Отрисовать маршрут (например, ``Stack.points``) поверх карты.
+
+        Без ``zoom`` масштаб подбирается так, чтобы весь маршрут поместился во фрагмент.
+        """
+        if not points:
+            raise ValueError("Route has no points")
+
+        pixels = self.world_to_pixel_many([p.x for p in points], [p.y for p in points])
+        low, high = pixels.min(axis=0), pixels.max(axis=0)
+
+        if zoom is None:
+            span_x, span_y = high - low
+            fit = max(span_x / (size_x * (1 - padding)), span_y / (size_y * (1 - padding)), 1)
+            zoom = int(np.ceil(np.log2(fit)))
+
+        center = (low + high) // 2
+        plan = self._plan_fragment(Point(int(center[0]), int(center[1])), size_x, size_y, zoom)
+        fragment = self._render_plan(plan, show_dot=False, dot_color="")
+
+        route_labels = [getattr(p, "number", None) for p in points] if labels else None
+        draw_route(fragment, plan.project(pixels), route_labels)
+        return fragment
+
     def _draw_dot(self, image: Image.Image, position: Point, color: str) -> None:
         draw = ImageDraw.Draw(image)
 
@@ -212,7 +598,7 @@ def main() -> None:
     import argparse
 
     parser = argparse.ArgumentParser(description="GTA V Map Tile Viewer")
-    parser.add_argument("tiles_dir", nargs="?", default="assets",
+    parser.add_argument("tiles_dir", nargs="?", default="assets/map",
                         help="Directory containing map tiles")
     parser.add_argument("-x", type=float, required=True,
                         help="World X coordinate")
@@ -222,6 +608,10 @@ def main() -> None:
                         help="Output image width in pixels")
     parser.add_argument("-sy", "--size_y", type=int, default=700,
                         help="Output image height in pixels")
+    parser.add_argument("-z", "--zoom", type=int, default=0,
+                        help="Zoom out level (each level halves the scale)")
+    parser.add_argument("-s", "--scale", type=float, default=1.0,
+                        help="Extra downscale factor in (0, 1] relative to the zoom level")
     parser.add_argument("-o", "--output", default="fragment.jpg",
                         help="Output file name")
     parser.add_argument("-c", "--color", default="green",
@@ -238,7 +628,9 @@ def main() -> None:
             world_point=world_point,
             size_x=args.size_x,
             size_y=args.size_y,
-            dot_color=args.color
+            dot_color=args.color,
+            zoom=args.zoom,
+            scale=args.scale,
         )
 
         fragment.save(args.output, quality=100)
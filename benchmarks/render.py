@@ -0,0 +1,278 @@
+"""Замеры отрисовки фрагментов ``GTAVTileViewer.get_fragment``.
+
+Случаи для каждого размера из ``--sizes``:
+
+* ``cold`` — кэш тайлов очищается перед каждой отрисовкой;
+* ``warm`` — повторная отрисовка уже отрисованных точек;
+* ``edge`` — точки у правого и нижнего края карты, где окно обрезается и
+  фрагмент досжимается LANCZOS (при прогретом кэше);
+* ``concurrent`` — ``--concurrency`` одновременных отрисовок через
+  ``AsyncTileViewer`` с пулом потоков, как в боте (с кодированием JPEG).
+
+Для каждого случая выводятся перцентили задержки, доля попаданий в кэш
+тайлов и пиковый RSS процесса на момент окончания случая. ``--output``
+сохраняет результаты в JSON для сравнения запусков.
+
+Тайлы берутся из ``--tiles-dir`` или генерируются (``--synthetic 24x24``),
+чтобы замеры не зависели от наличия карты:
+
+    python -m benchmarks.render --synthetic 24x24 --output render.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import PIL
+from PIL import Image
+
+from app.utils.async_viewer import AsyncTileViewer
+from app.utils.manifest import MANIFEST_NAME, TileManifest
+from app.utils.pyramid import build_pyramid
+from app.utils.viewer import GTAVTileViewer, Point
+
+
+def generate_tiles(root: Path, columns: int, rows: int, levels: int = 1, seed: int = 0,
+                   quality: int = 90) -> TileManifest:
+    """Записать синтетическую карту ``columns`` × ``rows`` тайлов в формате ``DirectoryTileSource``.
+
+    Тайлы — градиент с шумом, чтобы размер JPEG и стоимость декодирования
+    были ближе к настоящей карте, чем у однотонных тайлов.
+    """
+    rng = np.random.default_rng(seed)
+    size = GTAVTileViewer.TILE_SIZE
+    ramp = np.linspace(0, 160, size, dtype=np.float32)
+    tiles = set()
+    for x in range(columns):
+        column = root / str(x)
+        column.mkdir(parents=True, exist_ok=True)
+        for y in range(rows):
+            base = np.stack([
+                np.add.outer(ramp, ramp) / 2,
+                np.full((size, size), 40 + 200 * x / columns, dtype=np.float32),
+                np.full((size, size), 40 + 200 * y / rows, dtype=np.float32),
+            ], axis=-1)
+            noise = rng.normal(0, 24, (size, size, 3))
+            pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+            Image.fromarray(pixels, "RGB").save(column / f"{y}.jpg", quality=quality)
+            tiles.add((x, y))
+
+    manifest = TileManifest.from_tiles(tiles, size)
+    manifest.save(root / MANIFEST_NAME)
+    if levels > 1:
+        manifest = build_pyramid(root, levels, quality)
+    return manifest
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class CaseResult:
+    case: str
+    size: str
+    samples: int
+    throughput_per_sec: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    tile_hit_ratio: float
+    resized_ratio: float
+    peak_rss_mb: float
+
+
+class RenderBenchmark:
+    def __init__(self, viewer: GTAVTileViewer, zoom: int, encode: bool, seed: int):
+        self.viewer = viewer
+        self.zoom = zoom
+        self.encode = encode
+        self.rng = random.Random(seed)
+
+    def random_points(self, count: int) -> list[Point]:
+        width, height = self.viewer.map_width, self.viewer.map_height
+        pixels_x = [self.rng.uniform(0, width - 1) for _ in range(count)]
+        pixels_y = [self.rng.uniform(0, height - 1) for _ in range(count)]
+        return [Point(float(x), float(y)) for x, y in self.viewer.pixel_to_world_many(pixels_x, pixels_y)]
+
+    def edge_points(self, count: int) -> list[Point]:
+        # Правый и нижний края: окно упирается в границу карты и становится уже запрошенного
+        width, height = self.viewer.map_width, self.viewer.map_height
+        pixels_x, pixels_y = [], []
+        for i in range(count):
+            along = self.rng.uniform(0, 1)
+            if i % 2:
+                pixels_x.append(width - 1)
+                pixels_y.append(along * (height - 1))
+            else:
+                pixels_x.append(along * (width - 1))
+                pixels_y.append(height - 1)
+        return [Point(float(x), float(y)) for x, y in self.viewer.pixel_to_world_many(pixels_x, pixels_y)]
+
+    def _render(self, point: Point, size: tuple[int, int]) -> None:
+        if self.encode:
+            self.viewer.get_fragment_bytes(point, *size, zoom=self.zoom)
+        else:
+            self.viewer.get_fragment(point, *size, zoom=self.zoom)
+
+    def _resized(self, point: Point, size: tuple[int, int]) -> bool:
+        plan = self.viewer._plan_fragment(self.viewer.world_to_pixel(point), *size, self.zoom)
+        left, top, right, bottom = plan.region
+        reduction = plan.reduction
+        composed = (-(-right // reduction) - left // reduction, -(-bottom // reduction) - top // reduction)
+        return composed != plan.size
+
+    def _result(self, case: str, size: tuple[int, int], points: list[Point], latencies: list[float],
+                elapsed: float, stats_before, stats_after) -> CaseResult:
+        hits = stats_after.hits - stats_before.hits
+        misses = stats_after.misses - stats_before.misses
+        return CaseResult(
+            case=case,
+            size=f"{size[0]}x{size[1]}",
+            samples=len(latencies),
+            throughput_per_sec=len(latencies) / elapsed,
+            p50_ms=percentile(latencies, 0.50),
+            p95_ms=percentile(latencies, 0.95),
+            p99_ms=percentile(latencies, 0.99),
+            max_ms=max(latencies),
+            tile_hit_ratio=hits / (hits + misses) if hits + misses else 0.0,
+            resized_ratio=sum(self._resized(point, size) for point in points) / len(points),
+            peak_rss_mb=peak_rss_mb(),
+        )
+
+    def run_sync(self, case: str, size: tuple[int, int], points: list[Point], samples: int,
+                 before_each: Callable[[], None] | None = None) -> CaseResult:
+        latencies = []
+        stats_before = self.viewer.tile_cache.stats()
+        started = time.perf_counter()
+        for i in range(samples):
+            if before_each is not None:
+                before_each()
+            point = points[i % len(points)]
+            render_started = time.perf_counter()
+            self._render(point, size)
+            latencies.append((time.perf_counter() - render_started) * 1000)
+        elapsed = time.perf_counter() - started
+        return self._result(case, size, points, latencies, elapsed, stats_before, self.viewer.tile_cache.stats())
+
+    async def run_concurrent(self, size: tuple[int, int], points: list[Point], concurrency: int,
+                             workers: int | None) -> CaseResult:
+        async_viewer = AsyncTileViewer(self.viewer, "thread", max_workers=workers)
+        latencies = []
+
+        async def render(point: Point) -> None:
+            render_started = time.perf_counter()
+            await async_viewer.render_fragment(point, *size, zoom=self.zoom)
+            latencies.append((time.perf_counter() - render_started) * 1000)
+
+        stats_before = self.viewer.tile_cache.stats()
+        started = time.perf_counter()
+        try:
+            for offset in range(0, len(points), concurrency):
+                await asyncio.gather(*(render(point) for point in points[offset:offset + concurrency]))
+        finally:
+            async_viewer.shutdown()
+        elapsed = time.perf_counter() - started
+        return self._result(f"concurrent x{concurrency}", size, points, latencies, elapsed, stats_before,
+                            self.viewer.tile_cache.stats())
+
+
+def parse_size(value: str) -> tuple[int, int]:
+    width, _, height = value.partition("x")
+    return int(width), int(height)
+
+
+async def run(args: argparse.Namespace, tiles_dir: Path) -> list[CaseResult]:
+    viewer = GTAVTileViewer(str(tiles_dir), cache_mb=args.cache_mb)
+    bench = RenderBenchmark(viewer, args.zoom, args.encode, args.seed)
+    results = []
+
+    for size in args.sizes:
+        cold_points = bench.random_points(args.samples)
+        results.append(bench.run_sync("cold", size, cold_points, args.samples, viewer.tile_cache.clear))
+
+        warm_points = bench.random_points(args.warm_points)
+        for point in warm_points:
+            bench._render(point, size)
+        results.append(bench.run_sync("warm", size, warm_points, args.samples))
+
+        edge_points = bench.edge_points(args.warm_points)
+        for point in edge_points:
+            bench._render(point, size)
+        results.append(bench.run_sync("edge", size, edge_points, args.samples))
+
+        viewer.tile_cache.clear()
+        results.append(await bench.run_concurrent(size, bench.random_points(args.samples), args.concurrency,
+                                                  args.workers))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tiles-dir", type=Path, default=Path("assets/map"))
+    parser.add_argument("--synthetic", type=parse_size, metavar="COLSxROWS",
+                        help="Сгенерировать синтетическую карту вместо --tiles-dir")
+    parser.add_argument("--synthetic-levels", type=int, default=1, help="Уровней пирамиды синтетической карты")
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[(800, 600), (1700, 600)])
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--warm-points", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None, help="Потоков отрисовки (по умолчанию по числу CPU)")
+    parser.add_argument("--zoom", type=int, default=0)
+    parser.add_argument("--cache-mb", type=float, default=64)
+    parser.add_argument("--encode", action="store_true", help="Замерять get_fragment_bytes вместе с JPEG")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Куда записать результаты в JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="render-bench-") as temp_dir:
+        tiles_dir = args.tiles_dir
+        if args.synthetic:
+            tiles_dir = Path(temp_dir)
+            generate_tiles(tiles_dir, *args.synthetic, levels=args.synthetic_levels, seed=args.seed)
+        results = asyncio.run(run(args, tiles_dir))
+
+    print(f"{'case':>14} {'size':>9} {'n':>5} {'per sec':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'hit':>5} {'resized':>7} {'rss MB':>7}")
+    for r in results:
+        print(f"{r.case:>14} {r.size:>9} {r.samples:>5} {r.throughput_per_sec:>8.1f} {r.p50_ms:>8.1f} "
+              f"{r.p95_ms:>8.1f} {r.p99_ms:>8.1f} {r.tile_hit_ratio:>5.2f} {r.resized_ratio:>7.2f} "
+              f"{r.peak_rss_mb:>7.0f}")
+
+    if args.output:
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "pillow": PIL.__version__,
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "tiles": f"synthetic {args.synthetic[0]}x{args.synthetic[1]}" if args.synthetic else str(tiles_dir),
+                "zoom": args.zoom,
+                "encode": args.encode,
+                "cache_mb": args.cache_mb,
+                "seed": args.seed,
+            },
+            "results": [asdict(r) for r in results],
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Сравнение прежнего текстового формата сессий с ``session_codec``.
+
+Прежний формат: поля сессии строками в хэше, участники — JSON-массив
+JSON-строк в поле ``participants``, при чтении всё проходит валидацию
+pydantic. Сравниваются кодирование, декодирование и размер данных на
+одну сессию (поля хэша сессии и участников вместе).
+
+    python -m benchmarks.session_codec --participants 0 10 50 --iterations 20000
+"""
+import argparse
+import json
+import timeit
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+from app.models.discord import DiscordColor, Session, SessionParticipant, SessionState
+from app.repositories.session_codec import (
+    decode_participants, decode_session, encode_participant, encode_session,
+)
+
+
+def make_session(participants: int) -> Session:
+    now = datetime.now(tz=UTC)
+    return Session(
+        id=uuid4(),
+        title="Benchmark session",
+        description="Session used to compare serialization formats",
+        color=DiscordColor.random(),
+        created_at=now,
+        ends_at=now + timedelta(hours=24),
+        state=SessionState.undefined,
+        author_id=123456789012345678,
+        participants=[
+            SessionParticipant(
+                user_id=987654321098765432 + i,
+                username=f"user{i}",
+                joined_at=now + timedelta(seconds=i),
+            )
+            for i in range(participants)
+        ],
+    )
+
+
+def legacy_encode(session: Session) -> dict[bytes, bytes]:
+    participants = [
+        json.dumps({
+            "user_id": p.user_id,
+            "username": p.username,
+            "joined_at": p.joined_at.isoformat(),
+        })
+        for p in session.participants
+    ]
+    data = {
+        "id": str(session.id),
+        "title": session.title,
+        "description": session.description,
+        "color": session.color.as_hex() if session.color else None,
+        "created_at": session.created_at.isoformat(),
+        "ends_at": session.ends_at.isoformat(),
+        "state": session.state.value,
+        "author_id": str(session.author_id) if session.author_id else None,
+        "participants": json.dumps(participants),
+    }
+    # Так значения возвращает HGETALL
+    return {k.encode(): str(v).encode() for k, v in data.items() if v is not None}
+
+
+def legacy_decode(raw: dict[bytes, bytes]) -> Session:
+    data = {k.decode(): v.decode() for k, v in raw.items()}
+    participants = []
+    for item in json.loads(data.get("participants", "[]")):
+        parsed = json.loads(item)
+        participants.append(SessionParticipant(
+            user_id=parsed["user_id"],
+            username=parsed["username"],
+            joined_at=datetime.fromisoformat(parsed["joined_at"]),
+        ))
+    author_id = data.get("author_id")
+    return Session(
+        id=data["id"],
+        title=data["title"],
+        description=data["description"],
+        color=data.get("color"),
+        created_at=datetime.fromisoformat(data["created_at"]),
+        ends_at=datetime.fromisoformat(data["ends_at"]),
+        state=int(data.get("state", 0)),
+        author_id=int(author_id) if author_id else None,
+        participants=participants,
+    )
+
+
+def codec_encode(session: Session) -> tuple[bytes, dict[bytes, bytes]]:
+    participants = {str(p.user_id).encode(): encode_participant(p) for p in session.participants}
+    return encode_session(session), participants
+
+
+def codec_decode(raw: tuple[bytes, dict[bytes, bytes]]) -> Session:
+    data, participants_data = raw
+    participants = sorted(
+        decode_participants((int(user_id), value) for user_id, value in participants_data.items()),
+        key=lambda p: p.joined_at,
+    )
+    return decode_session(data, participants)
+
+
+def legacy_size(raw: dict[bytes, bytes]) -> int:
+    return sum(len(k) + len(v) for k, v in raw.items())
+
+
+def codec_size(raw: tuple[bytes, dict[bytes, bytes]]) -> int:
+    data, participants = raw
+    return len(b"data") + len(data) + sum(len(k) + len(v) for k, v in participants.items())
+
+
+def measure(func, arg, iterations: int) -> float:
+    """Лучшее из пяти повторов, мкс на операцию."""
+    best = min(timeit.repeat(lambda: func(arg), number=iterations, repeat=5))
+    return best / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--participants", type=int, nargs="+", default=[0, 10, 50])
+    parser.add_argument("--iterations", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'participants':>12} {'format':>7} {'encode us':>10} {'decode us':>10} {'bytes':>7}")
+    for count in args.participants:
+        session = make_session(count)
+        for name, encode, decode, size in (
+            ("legacy", legacy_encode, legacy_decode, legacy_size),
+            ("codec", codec_encode, codec_decode, codec_size),
+        ):
+            raw = encode(session)
+            decoded = decode(raw)
+            assert decoded.model_dump() == session.model_dump(), f"{name} round trip mismatch"
+            print(
+                f"{count:>12} {name:>7} {measure(encode, session, args.iterations):>10.2f} "
+                f"{measure(decode, raw, args.iterations):>10.2f} {size(raw):>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Замеры реализаций ``SessionRepository``.
+
+На ``--sizes`` заранее созданных сессий замеряются create, get, get_all,
+join и leave: операций в секунду и перцентили задержки одной операции.
+Контракт хранилищ проверяется тестами в ``tests/test_session_repository.py``.
+
+Хранилища: ``memory`` — ``InMemorySessionRepository``, ``fakeredis`` —
+``RedisSessionRepository`` поверх fakeredis (нужны пакеты fakeredis и
+lupa для Lua), ``redis`` — настоящий сервер по ``--redis-url``. База
+сервера очищается перед замерами, поэтому ``redis`` требует ``--flush``.
+
+    python -m benchmarks.session_repository --backends memory fakeredis --sizes 1000 10000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+from redis.asyncio import Redis
+
+from app.models.discord import DiscordColor, Session, SessionParticipant, SessionState
+from app.repositories.memory_session_repository import InMemorySessionRepository
+from app.repositories.redis_session_repository import RedisSessionRepository
+from app.repositories.session_repository import SessionRepository
+
+
+def make_session(participants: int = 1, ends_in: timedelta = timedelta(hours=24)) -> Session:
+    """Сессия с ``participants`` участниками; её же используют тесты хранилищ."""
+    now = datetime.now(tz=UTC)
+    return Session(
+        id=uuid4(),
+        title="Benchmark session",
+        description="Session used to benchmark repositories",
+        color=DiscordColor.random(),
+        created_at=now,
+        ends_at=now + ends_in,
+        state=SessionState.undefined,
+        author_id=123456789012345678,
+        participants=[
+            SessionParticipant(
+                user_id=987654321098765432 + i,
+                username=f"user{i}",
+                joined_at=now - timedelta(seconds=participants - i),
+            )
+            for i in range(participants)
+        ],
+    )
+
+
+def make_participant(user_id: int) -> SessionParticipant:
+    return SessionParticipant(user_id=user_id, username=f"user{user_id}", joined_at=datetime.now(tz=UTC))
+
+
+@dataclass
+class Result:
+    backend: str
+    sessions: int
+    operation: str
+    count: int
+    ops_per_sec: float
+    p50_us: float
+    p95_us: float
+    p99_us: float
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def timed(calls: list[Callable[[], Awaitable]]) -> list[float]:
+    """Выполнить вызовы по одному и вернуть длительность каждого в микросекундах."""
+    samples = []
+    for call in calls:
+        started = time.perf_counter_ns()
+        await call()
+        samples.append((time.perf_counter_ns() - started) / 1000)
+    return samples
+
+
+def summarize(backend: str, size: int, operation: str, samples: list[float]) -> Result:
+    return Result(
+        backend=backend,
+        sessions=size,
+        operation=operation,
+        count=len(samples),
+        ops_per_sec=len(samples) / (sum(samples) / 1e6),
+        p50_us=percentile(samples, 0.50),
+        p95_us=percentile(samples, 0.95),
+        p99_us=percentile(samples, 0.99),
+    )
+
+
+async def bench_size(repo: SessionRepository, backend: str, size: int, ops: int, get_all_runs: int) -> list[Result]:
+    await repo.delete_all()
+    sessions = [make_session() for _ in range(size)]
+    results = [summarize(backend, size, "create", await timed([lambda s=s: repo.create(s) for s in sessions]))]
+
+    ids = [s.id for s in sessions]
+    picked = [random.choice(ids) for _ in range(ops)]
+    results.append(summarize(backend, size, "get", await timed([lambda i=i: repo.get_by_id(i) for i in picked])))
+
+    joins = [(session_id, make_participant(n)) for n, session_id in enumerate(picked)]
+    results.append(summarize(backend, size, "join", await timed(
+        [lambda i=i, p=p: repo.add_participant(i, p) for i, p in joins]
+    )))
+    results.append(summarize(backend, size, "leave", await timed(
+        [lambda i=i, p=p: repo.remove_participant(i, p.user_id) for i, p in joins]
+    )))
+
+    results.append(summarize(backend, size, "get_all", await timed([repo.get_all] * get_all_runs)))
+    await repo.delete_all()
+    return results
+
+
+async def open_backend(name: str, redis_url: str) -> tuple[SessionRepository, Redis | None]:
+    if name == "memory":
+        return InMemorySessionRepository(), None
+    if name == "fakeredis":
+        import fakeredis
+        redis = fakeredis.FakeAsyncRedis()
+    else:
+        redis = Redis.from_url(redis_url)
+        await redis.flushdb()
+    return RedisSessionRepository(redis), redis
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=["memory", "fakeredis", "redis"], default=["memory", "fakeredis"])
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--flush", action="store_true", help="Разрешить очистку базы --redis-url")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--ops", type=int, default=2000, help="Сколько раз замерять get, join и leave")
+    parser.add_argument("--get-all-runs", type=int, default=3)
+    parser.add_argument("--json", help="Куда дополнительно записать результаты")
+    args = parser.parse_args()
+    if "redis" in args.backends and not args.flush:
+        parser.error(f"backend redis flushes {args.redis_url}, pass --flush to confirm")
+
+    results = []
+    print(f"{'backend':>10} {'sessions':>9} {'operation':>9} {'ops/sec':>10} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}")
+    for backend in args.backends:
+        repo, redis = await open_backend(backend, args.redis_url)
+        try:
+            for size in args.sizes:
+                for result in await bench_size(repo, backend, size, args.ops, args.get_all_runs):
+                    results.append(result)
+                    print(
+                        f"{result.backend:>10} {result.sessions:>9} {result.operation:>9} "
+                        f"{result.ops_per_sec:>10.0f} {result.p50_us:>9.1f} {result.p95_us:>9.1f} {result.p99_us:>9.1f}"
+                    )
+        finally:
+            if redis is not None:
+                await redis.aclose()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
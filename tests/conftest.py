@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+
+from app.repositories.cached_session_repository import SessionCache
+
+
+@pytest.fixture
+async def start_cache():
+    """Запуск ``SessionCache`` с ожиданием подписки; кэши останавливаются после теста."""
+    caches: list[SessionCache] = []
+
+    async def start(redis, **kwargs) -> SessionCache:
+        cache = SessionCache(redis, **kwargs)
+        caches.append(cache)
+        cache.start()
+        async with asyncio.timeout(5):
+            while not cache.subscribed:
+                await asyncio.sleep(0.01)
+        return cache
+
+    yield start
+    for cache in caches:
+        await cache.stop()
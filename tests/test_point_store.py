@@ -0,0 +1,92 @@
+"""``PointStore`` и потоковый разбор ``points.json``."""
+import io
+import json
+import pickle
+from uuid import uuid4
+
+import pytest
+
+from app.models.gta import Point
+from app.utils.point_store import PointStore, iter_json_array
+
+# Строки с разделителями и экранированием, числа, которые граница куска
+# может обрезать, вложенные массивы и пробелы вокруг разделителей
+TRICKY_ITEMS = [
+    {"uuid": str(uuid4()), "x": 2.5, "y": -1e-3, "number": "a, b]"},
+    {"uuid": str(uuid4()), "x": 12345.678, "y": 0, "number": "\"]\\,"},
+    [1, [2, [3, "]"]], {"k": ","}],
+    "строка, с ] внутри",
+    -0.0,
+    123456789012345678,
+    None,
+    True,
+    {},
+    [],
+]
+
+
+def make_points() -> list[Point]:
+    return [
+        Point(uuid=uuid4(), x=1.5, y=-2.25, z=3.0, level=1, number="12"),
+        Point(uuid=uuid4(), x=0.0, y=0.0, z=None, level=None, number=None),
+        Point(uuid=uuid4(), x=-4000.0, y=8000.0, level=0, number=""),
+        Point(uuid=uuid4(), x=10.0, y=20.0),
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_json_array_across_chunks(chunk_size: int, indent: int | None):
+    text = json.dumps(TRICKY_ITEMS, indent=indent, ensure_ascii=False)
+
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == TRICKY_ITEMS
+
+
+@pytest.mark.parametrize("text", ["", "  ", "[]", " [ ] "])
+def test_iter_json_array_empty(text: str):
+    assert list(iter_json_array(io.StringIO(text), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize("text", ["{}", "[1 2]", "[1,", "[1"])
+def test_iter_json_array_rejects_malformed(text: str):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), chunk_size=1))
+
+
+def test_points_round_trip():
+    points = make_points()
+    store = PointStore.from_points(points)
+
+    assert store.views(range(len(points))) == points
+    assert store.get(points[1].uuid).number is None
+    assert store.get(points[2].uuid).number == ""
+
+
+def test_load_round_trip(tmp_path):
+    points = make_points()
+    path = tmp_path / "points.json"
+    path.write_text(json.dumps([point.model_dump(mode="json") for point in points]), encoding="utf-8")
+
+    store = PointStore.load(path, chunk_size=3)
+
+    assert [store.get(point.uuid) for point in points] == points
+
+
+def test_repeated_uuid_updates_row():
+    point = make_points()[0]
+    store = PointStore(capacity=1)
+    store.add_records([
+        point.model_dump(mode="json"),
+        {**point.model_dump(mode="json"), "x": 99.0, "number": None},
+    ])
+
+    assert len(store) == 1
+    assert store.get(point.uuid) == point.model_copy(update={"x": 99.0, "number": None})
+    assert store.index.query_rect(98, point.y - 1, 100, point.y + 1).tolist() == [0]
+
+
+def test_pickle_keeps_missing_numbers():
+    points = make_points()
+    store = pickle.loads(pickle.dumps(PointStore.from_points(points)))
+
+    assert store.views(range(len(points))) == points
@@ -0,0 +1,149 @@
+"""Согласованность ``SessionCache`` и ``CachedSessionRepository``.
+
+Два кэша на одном сервере fakeredis изображают два процесса бота.
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from app.repositories.cached_session_repository import CachedSessionRepository, SessionCache
+from app.repositories.redis_session_repository import RedisSessionRepository
+from benchmarks.session_repository import make_participant, make_session
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+@pytest.fixture
+async def clients():
+    server = fakeredis.FakeServer()
+    clients = [fakeredis.FakeAsyncRedis(server=server) for _ in range(2)]
+    yield clients
+    for client in clients:
+        await client.aclose()
+
+
+@pytest.fixture
+def redis(clients):
+    return clients[0]
+
+
+async def wait_for(predicate, timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not await predicate():
+            await asyncio.sleep(0.01)
+
+
+async def test_not_used_before_subscription(redis):
+    cache = SessionCache(redis)
+    session = make_session()
+
+    cache.set(session, cache.generation)
+
+    assert not cache.subscribed
+    assert cache.get(session.id) is None
+    assert len(cache) == 0
+
+
+async def test_stale_generation_is_not_stored(redis, start_cache):
+    cache = await start_cache(redis)
+    session = make_session()
+
+    generation = cache.generation
+    # Инвалидация пришла, пока сессия читалась из хранилища
+    cache.invalidate(session.id)
+    cache.set(session, generation)
+    assert cache.get(session.id) is None
+
+    cache.set(session, cache.generation)
+    assert cache.get(session.id) == session
+
+
+async def test_returns_copies(redis, start_cache):
+    cache = await start_cache(redis)
+    session = make_session(participants=2)
+
+    cache.set(session, cache.generation)
+    cache.get(session.id).participants.clear()
+    session.participants.clear()
+
+    assert len(cache.get(session.id).participants) == 2
+
+
+async def test_entries_expire_by_ttl(redis, start_cache):
+    cache = await start_cache(redis, ttl_seconds=0.05)
+    session = make_session()
+    cache.set(session, cache.generation)
+    assert cache.get(session.id) is not None
+
+    await asyncio.sleep(0.1)
+    assert cache.get(session.id) is None
+    assert len(cache) == 0
+
+
+async def test_entries_expire_at_ends_at(redis, start_cache):
+    cache = await start_cache(redis)
+    session = make_session(ends_in=timedelta(seconds=0.05))
+    cache.set(session, cache.generation)
+    assert cache.get(session.id) is not None
+
+    await asyncio.sleep(0.1)
+    assert cache.get(session.id) is None
+
+
+async def test_lru_eviction(redis, start_cache):
+    cache = await start_cache(redis, max_entries=2)
+    sessions = [make_session() for _ in range(3)]
+
+    cache.set(sessions[0], cache.generation)
+    cache.set(sessions[1], cache.generation)
+    cache.get(sessions[0].id)
+    cache.set(sessions[2], cache.generation)
+
+    assert cache.get(sessions[1].id) is None
+    assert cache.get(sessions[0].id) is not None
+    assert cache.get(sessions[2].id) is not None
+
+
+async def test_writes_invalidate_other_processes(clients, start_cache):
+    first_cache = await start_cache(clients[0])
+    second_cache = await start_cache(clients[1])
+    first = CachedSessionRepository(RedisSessionRepository(clients[0]), first_cache)
+    second = CachedSessionRepository(RedisSessionRepository(clients[1]), second_cache)
+    session = make_session()
+    await first.create(session)
+
+    await second.get_by_id(session.id)
+    hits = second_cache.hits
+    assert (await second.get_by_id(session.id)).title == session.title
+    assert second_cache.hits == hits + 1
+
+    await first.update(session.model_copy(update={"title": "Changed"}))
+
+    async def title_changed():
+        return (await second.get_by_id(session.id)).title == "Changed"
+    await wait_for(title_changed)
+
+    await first.add_participant(session.id, make_participant(1))
+
+    async def joined():
+        return await second.is_participant(session.id, 1)
+    await wait_for(joined)
+
+    await first.delete_all()
+
+    async def deleted():
+        return await second.get_by_id(session.id) is None
+    await wait_for(deleted)
+
+
+async def test_unsubscribed_cache_is_emptied(redis, start_cache):
+    cache = await start_cache(redis)
+    session = make_session()
+    cache.set(session, cache.generation)
+
+    await cache.stop()
+
+    assert not cache.subscribed
+    assert len(cache) == 0
@@ -0,0 +1,251 @@
+"""Общий контракт реализаций ``SessionRepository``.
+
+Каждый тест выполняется для ``InMemorySessionRepository``, для
+``RedisSessionRepository`` поверх fakeredis и для него же за
+``CachedSessionRepository`` с подписанным ``SessionCache``. Чтобы прогнать контракт и на
+настоящем сервере, укажите ``REDIS_TEST_URL`` — база по этому адресу
+очищается перед каждым тестом:
+
+    REDIS_TEST_URL=redis://localhost:6379/15 pytest tests/test_session_repository.py
+"""
+import json
+import os
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.models.discord import Session
+from app.repositories.cached_session_repository import CachedSessionRepository
+from app.repositories.memory_session_repository import InMemorySessionRepository
+from app.repositories.redis_session_repository import RedisSessionRepository
+from app.repositories.session_repository import SessionRepository
+from benchmarks.session_repository import make_participant, make_session
+
+REDIS_TEST_URL = os.environ.get("REDIS_TEST_URL")
+
+
+
+@pytest.fixture(params=[
+    "memory",
+    "fakeredis",
+    "cached",
+    pytest.param("redis", marks=pytest.mark.skipif(not REDIS_TEST_URL, reason="REDIS_TEST_URL is not set")),
+])
+async def repo(request, start_cache):
+    if request.param == "memory":
+        yield InMemorySessionRepository()
+        return
+
+    if request.param == "redis":
+        from redis.asyncio import Redis
+        redis = Redis.from_url(REDIS_TEST_URL)
+        await redis.flushdb()
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        redis = fakeredis.FakeAsyncRedis()
+    try:
+        repository = RedisSessionRepository(redis)
+        if request.param == "cached":
+            repository = CachedSessionRepository(repository, await start_cache(redis))
+        yield repository
+    finally:
+        await redis.aclose()
+
+
+async def test_create_and_get(repo: SessionRepository):
+    session = make_session(participants=2)
+
+    assert await repo.create(session) == session
+    stored = await repo.get_by_id(session.id)
+    assert stored is not None
+    assert stored.model_dump() == session.model_dump()
+
+
+async def test_get_missing_session(repo: SessionRepository):
+    assert await repo.get_by_id(uuid4()) is None
+
+
+async def test_returns_copies(repo: SessionRepository):
+    session = make_session(participants=2)
+    await repo.create(session)
+
+    stored = await repo.get_by_id(session.id)
+    stored.participants.clear()
+
+    assert await repo.participant_count(session.id) == 2
+
+
+async def test_add_participant_once(repo: SessionRepository):
+    session = make_session(participants=2)
+    await repo.create(session)
+
+    assert await repo.add_participant(session.id, make_participant(1))
+    assert not await repo.add_participant(session.id, make_participant(1))
+    assert await repo.is_participant(session.id, 1)
+    assert await repo.participant_count(session.id) == 3
+
+
+async def test_participants_in_join_order(repo: SessionRepository):
+    session = make_session(participants=2)
+    await repo.create(session)
+    await repo.add_participant(session.id, make_participant(1))
+
+    stored = await repo.get_by_id(session.id)
+    assert [p.user_id for p in stored.participants] == [*(p.user_id for p in session.participants), 1]
+
+
+async def test_remove_participant(repo: SessionRepository):
+    session = make_session()
+    await repo.create(session)
+    await repo.add_participant(session.id, make_participant(1))
+
+    assert await repo.remove_participant(session.id, 1)
+    assert not await repo.remove_participant(session.id, 1)
+    assert not await repo.is_participant(session.id, 1)
+
+
+async def test_participant_changes_on_missing_session(repo: SessionRepository):
+    with pytest.raises(ValueError):
+        await repo.add_participant(uuid4(), make_participant(1))
+    with pytest.raises(ValueError):
+        await repo.remove_participant(uuid4(), 1)
+
+
+async def test_counts_for_missing_session(repo: SessionRepository):
+    assert await repo.participant_count(uuid4()) == 0
+    assert not await repo.is_participant(uuid4(), 1)
+
+
+async def test_update_keeps_participants(repo: SessionRepository):
+    session = make_session(participants=2)
+    await repo.create(session)
+
+    await repo.update(session.model_copy(update={"title": "Changed", "participants": []}))
+
+    updated = await repo.get_by_id(session.id)
+    assert updated.title == "Changed"
+    assert len(updated.participants) == 2
+
+
+async def test_update_missing_session(repo: SessionRepository):
+    with pytest.raises(ValueError):
+        await repo.update(make_session())
+
+
+async def test_get_ends_at(repo: SessionRepository):
+    session = make_session()
+    await repo.create(session)
+
+    ends_at = await repo.get_ends_at(session.id)
+    assert ends_at is not None
+    assert abs((ends_at - session.ends_at).total_seconds()) < 1
+    assert await repo.get_ends_at(uuid4()) is None
+
+
+async def test_get_all_and_iter_sessions(repo: SessionRepository):
+    sessions = [make_session() for _ in range(5)]
+    for session in sessions:
+        await repo.create(session)
+    ids = {s.id for s in sessions}
+
+    assert {s.id for s in await repo.get_all(batch_size=2)} == ids
+    assert {s.id async for s in repo.iter_sessions(batch_size=2)} == ids
+
+
+async def test_delete(repo: SessionRepository):
+    session = make_session()
+    await repo.create(session)
+
+    assert await repo.delete(session.id)
+    assert not await repo.delete(session.id)
+    assert await repo.get_by_id(session.id) is None
+
+
+async def test_expired_sessions_are_hidden(repo: SessionRepository):
+    session = make_session(ends_in=timedelta(seconds=-5))
+    await repo.create(session)
+
+    assert await repo.get_by_id(session.id) is None
+    assert await repo.get_all() == []
+
+
+async def test_remove_expired_in_batches(repo: SessionRepository):
+    expired = [make_session(ends_in=timedelta(seconds=-5)) for _ in range(3)]
+    for session in expired:
+        await repo.create(session)
+    live = make_session()
+    await repo.create(live)
+
+    now = datetime.now(tz=UTC)
+    assert await repo.remove_expired(now, batch_size=2) == 2
+    assert await repo.remove_expired(now, batch_size=2) == 1
+    assert await repo.remove_expired(now, batch_size=2) == 0
+    assert await repo.get_ends_at(expired[0].id) is None
+    assert await repo.get_by_id(live.id) is not None
+
+
+async def test_migrate_without_legacy_data(repo: SessionRepository):
+    session = make_session()
+    await repo.create(session)
+
+    assert await repo.migrate() == 0
+    assert await repo.get_by_id(session.id) is not None
+
+
+async def test_delete_all(repo: SessionRepository):
+    for _ in range(3):
+        await repo.create(make_session())
+
+    assert await repo.delete_all() == 3
+    assert await repo.get_all() == []
+
+
+def legacy_session_fields(session: Session) -> dict:
+    """Хэш сессии в текстовом формате, записанный до EXPIREAT и индекса по ends_at."""
+    return {
+        "id": str(session.id),
+        "title": session.title,
+        "description": session.description,
+        "color": session.color.as_hex(),
+        "created_at": session.created_at.isoformat(),
+        "ends_at": session.ends_at.isoformat(),
+        "state": session.state.value,
+        "author_id": str(session.author_id),
+        "participants": json.dumps([
+            json.dumps({"user_id": p.user_id, "username": p.username, "joined_at": p.joined_at.isoformat()})
+            for p in session.participants
+        ]),
+    }
+
+
+async def test_legacy_sessions_get_expiry():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis = fakeredis.FakeAsyncRedis()
+    repo = RedisSessionRepository(redis)
+    live = make_session(participants=2)
+    expired = make_session(ends_in=timedelta(seconds=-5))
+    for session in (live, expired):
+        await redis.hset(repo._get_key(session.id), mapping=legacy_session_fields(session))
+        await redis.sadd(repo.ALL_SESSIONS_KEY, str(session.id))
+    current = make_session()
+    await repo.create(current)
+
+    try:
+        assert await repo.migrate() == 2
+        assert await repo.migrate() == 0
+
+        ends_at = await repo.get_ends_at(live.id)
+        assert ends_at is not None
+        assert abs((ends_at - live.ends_at).total_seconds()) < 1
+        assert await redis.ttl(repo._get_key(live.id)) > 0
+        assert await redis.ttl(repo._get_participants_key(live.id)) > 0
+        assert await repo.participant_count(live.id) == 2
+
+        assert await repo.remove_expired(datetime.now(tz=UTC)) == 1
+        assert await repo.get_by_id(expired.id) is None
+        assert {s.id for s in await repo.get_all()} == {live.id, current.id}
+    finally:
+        await redis.aclose()
@@ -0,0 +1,111 @@
+"""``PointIndex`` против полного перебора по колонкам ``PointStore``."""
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.utils.point_store import PointStore
+
+LEVELS = (0, 1, None)
+
+
+def random_store(rng: np.random.Generator, count: int, cell_size: float = 250.0) -> PointStore:
+    store = PointStore(cell_size=cell_size)
+    store.add_records(
+        {
+            "uuid": str(uuid4()),
+            "x": float(x),
+            "y": float(y),
+            "level": LEVELS[level],
+        }
+        for x, y, level in zip(
+            rng.uniform(-4000, 4000, count),
+            rng.uniform(-4000, 8000, count),
+            rng.integers(0, len(LEVELS), count),
+        )
+    )
+    return store
+
+
+def level_mask(store: PointStore, level: int | None) -> np.ndarray:
+    levels = store.level[:len(store)]
+    return np.ones(len(store), dtype=bool) if level is None else levels == level
+
+
+def brute_nearest(store: PointStore, x: float, y: float, k: int, level: int | None,
+                  max_distance: float | None) -> list[float]:
+    rows = np.flatnonzero(level_mask(store, level))
+    distances = np.sort(np.hypot(store.x[rows] - x, store.y[rows] - y))[:k]
+    if max_distance is not None:
+        distances = distances[distances <= max_distance]
+    return distances.tolist()
+
+
+def query_points(rng: np.random.Generator, count: int) -> list[tuple[float, float]]:
+    near = list(zip(rng.uniform(-5000, 5000, count), rng.uniform(-5000, 9000, count)))
+    # Точки далеко за пределами сетки: поиск не должен обходить пустые кольца
+    far = [(1e7, 0.0), (-1e7, -1e7), (0.0, 3e6), (-2e5, 9e5)]
+    return near + far
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_nearest_matches_brute_force(seed: int):
+    rng = np.random.default_rng(seed)
+    store = random_store(rng, 3000)
+
+    for x, y in query_points(rng, 100):
+        k = int(rng.integers(1, 8))
+        # Уровень 5 не встречается в хранилище
+        level = (*LEVELS, 5)[int(rng.integers(0, len(LEVELS) + 1))]
+        max_distance = float(rng.uniform(0, 2000)) if rng.random() < 0.3 else None
+
+        found = store.index.nearest(x, y, k, level, max_distance)
+
+        assert [distance for distance, _ in found] == pytest.approx(
+            brute_nearest(store, x, y, k, level, max_distance))
+        for distance, row in found:
+            assert distance == pytest.approx(np.hypot(store.x[row] - x, store.y[row] - y))
+            assert level is None or store.level[row] == level
+
+
+def test_nearest_far_from_grid():
+    rng = np.random.default_rng(0)
+    store = random_store(rng, 1000, cell_size=10.0)
+
+    assert store.index.nearest(1e9, 1e9, 3)
+    assert store.index.nearest(1e9, 1e9, 3, max_distance=100.0) == []
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_query_rect_matches_brute_force(seed: int):
+    rng = np.random.default_rng(seed)
+    store = random_store(rng, 3000)
+    xs, ys = store.x[:len(store)], store.y[:len(store)]
+
+    for x, y in query_points(rng, 100):
+        width, height = rng.uniform(0, 3000, 2)
+        level = LEVELS[int(rng.integers(0, len(LEVELS)))]
+
+        found = store.index.query_rect(x, y, x + width, y + height, level)
+
+        mask = level_mask(store, level) & (xs >= x) & (xs <= x + width) & (ys >= y) & (ys <= y + height)
+        assert sorted(found.tolist()) == np.flatnonzero(mask).tolist()
+
+
+def test_updated_point_moves_in_index():
+    store = PointStore()
+    point_uuid = uuid4()
+    row = store.append(point_uuid, 0.0, 0.0)
+    store.append(uuid4(), 2000.0, 2000.0)
+
+    assert store.append(point_uuid, 1000.0, 1000.0) == row
+    assert len(store.index) == 2
+    assert store.index.query_rect(-10, -10, 10, 10).tolist() == []
+    assert store.index.nearest(990.0, 990.0)[0][1] == row
+
+
+def test_empty_index():
+    store = PointStore()
+
+    assert store.index.nearest(0.0, 0.0, 3) == []
+    assert store.index.query_rect(-1, -1, 1, 1).tolist() == []